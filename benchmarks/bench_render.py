@@ -0,0 +1,116 @@
+"""离线测量信息拼图各渲染阶段(解码缩放、排版、合成、编码)的耗时与峰值内存
+
+每个用例在独立的子进程中运行, 峰值内存为子进程运行期间常驻内存的增量。
+默认使用插件数据目录中已下载的 HarmonyOS Sans SC 字体, 与线上渲染一致;
+字体文件不存在时退回 Pillow 内置字体, 此时排版耗时与线上不可比。
+用法: python benchmarks/bench_render.py [--font PATH] [--mp 1 12 40] [--chars 300 3000]
+"""
+
+import sys
+import time
+import argparse
+import resource
+import multiprocessing
+from io import BytesIO
+from pathlib import Path
+
+import nonebot
+from PIL import Image, ImageFont
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+SAMPLE = (
+    "The Andromeda Galaxy is the nearest large spiral galaxy to the Milky Way. "
+    "Its disk spans about 260,000 light-years, and it is approaching us at "
+    "roughly 110 kilometers per second. "
+)
+STAGES = ("decode", "layout", "compose", "encode")
+
+
+def synthetic_jpeg(megapixels: float) -> bytes:
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(megapixels * 1_000_000 / width)
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 30)
+    image = Image.merge(
+        "RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_TOP_BOTTOM))
+    )
+    buf = BytesIO()
+    image.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def run_case(infopuzzle, raw: bytes, text: str, args, conn):
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    best: tuple[float, dict[str, float]] | None = None
+    for _ in range(args.number):
+        stages: dict[str, float] = {}
+        start = time.perf_counter()
+        image = infopuzzle._decode_image(raw)
+        stages["decode"] = time.perf_counter() - start
+        layout_start = time.perf_counter()
+        layout = infopuzzle._layout_text("Bench", text, "版权：无", "日期：2024-01-01")
+        stages["layout"] = time.perf_counter() - layout_start
+        _, stages["compose"], stages["encode"] = infopuzzle._compose_and_encode(
+            layout, image, False, args.format, args.quality, args.max_kb * 1024
+        )
+        wall = time.perf_counter() - start
+        if best is None or wall < best[0]:
+            best = (wall, stages)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    conn.send((*best, peak_kb))
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--font", help="TrueType 字体路径, 默认使用插件下载的字体")
+    parser.add_argument("--mp", type=float, nargs="+", default=[1, 4, 12, 24, 40])
+    parser.add_argument("--chars", type=int, nargs="+", default=[300, 1200, 3000])
+    parser.add_argument("--format", choices=["png", "jpeg", "webp"], default="png")
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--max-kb", type=int, default=0)
+    parser.add_argument("--number", type=int, default=3)
+    args = parser.parse_args()
+
+    nonebot.init(driver="~none", apod_api_key="BENCH")
+    nonebot.require("nonebot_plugin_apod")
+    from nonebot_plugin_apod import infopuzzle
+
+    if args.font:
+        infopuzzle._load_font = lambda size, bold=False: ImageFont.truetype(
+            args.font, size
+        )
+    elif infopuzzle._load_fonts() is None:
+        print(
+            f"未在 {infopuzzle.data_dir} 找到插件字体, 退回 Pillow 内置字体",
+            file=sys.stderr,
+        )
+        infopuzzle._load_font = lambda size, bold=False: ImageFont.load_default(size)
+    context = multiprocessing.get_context("fork")
+
+    print(
+        f"{'图片':>6} {'简介':>6} {'总耗时':>8} "
+        + " ".join(f"{stage:>8}" for stage in STAGES)
+        + f" {'峰值内存':>8}"
+    )
+    for megapixels in args.mp:
+        raw = synthetic_jpeg(megapixels)
+        for chars in args.chars:
+            text = (SAMPLE * (chars // len(SAMPLE) + 1))[:chars]
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=run_case, args=(infopuzzle, raw, text, args, sender)
+            )
+            process.start()
+            wall, stages, peak_kb = receiver.recv()
+            process.join()
+            print(
+                f"{megapixels:>4g}MP {chars:>6} {wall * 1000:>6.0f}ms "
+                + " ".join(f"{stages[stage] * 1000:>6.0f}ms" for stage in STAGES)
+                + f" {peak_kb / 1024:>6.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""对比 infopuzzle._wrap_text 与逐字符测量的旧实现的耗时
+
+用法: python benchmarks/bench_wrap_text.py [--font PATH] [--chars 1500]
+"""
+
+import sys
+import argparse
+import timeit
+from pathlib import Path
+
+import nonebot
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+SAMPLE = (
+    "仙女座星系（M31）是距离银河系最近的大型旋涡星系, 距离我们约 250 万光年。"
+    "The Andromeda Galaxy is the nearest large spiral galaxy to the Milky Way. "
+)
+
+
+def legacy_wrap_text(draw, text, font, max_width):
+    lines = []
+    for paragraph in text.split("\n"):
+        if not paragraph:
+            lines.append("")
+            continue
+        line = ""
+        for char in paragraph:
+            test = line + char
+            if draw.textlength(test, font=font) > max_width:
+                if line:
+                    lines.append(line)
+                line = char
+            else:
+                line = test
+        if line:
+            lines.append(line)
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--font", help="TrueType 字体路径, 默认使用 Pillow 内置字体")
+    parser.add_argument("--chars", type=int, default=1500)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    nonebot.init(driver="~none", apod_api_key="BENCH")
+    nonebot.require("nonebot_plugin_apod")
+    from nonebot_plugin_apod import infopuzzle
+
+    font = (
+        ImageFont.truetype(args.font, 40) if args.font else ImageFont.load_default(40)
+    )
+    draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    text = (SAMPLE * (args.chars // len(SAMPLE) + 1))[: args.chars]
+    width = infopuzzle.CONTENT_WIDTH
+
+    expected = legacy_wrap_text(draw, text, font, width)
+    actual = infopuzzle._wrap_text(draw, text, font, width)
+    assert actual == expected, "新旧实现的换行结果不一致"
+
+    legacy = timeit.timeit(
+        lambda: legacy_wrap_text(draw, text, font, width), number=args.number
+    )
+    current = timeit.timeit(
+        lambda: infopuzzle._wrap_text(draw, text, font, width), number=args.number
+    )
+    print(f"文本长度: {len(text)} 字符, 行数: {len(expected)}")
+    print(f"旧实现: {legacy / args.number * 1000:.2f} ms/次")
+    print(f"新实现: {current / args.number * 1000:.2f} ms/次")
+    print(f"加速比: {legacy / current:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
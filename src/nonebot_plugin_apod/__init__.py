@@ -1,6 +1,6 @@
-import json
+import asyncio
+from datetime import datetime
 
-import aiofiles
 from nonebot.rule import Rule
 from nonebot.log import logger
 from nonebot.permission import SUPERUSER
@@ -18,28 +18,29 @@ from nonebot_plugin_argot.extension import ArgotExtension
 from nonebot_plugin_alconna.uniseg import UniMessage, MsgTarget
 from nonebot_plugin_alconna import Args, Match, Option, Alconna, CommandMeta, on_alconna
 
-from .config import Config, plugin_config, get_cache_image, set_cache_image
+from .config import Config, plugin_config
 from .apod import (
-    generate_job_id,
+    get_apod_task,
     remove_apod_task,
     schedule_apod_task,
-    generate_apod_image,
+    prepare_apod_content,
+    generate_slot_job_id,
 )
 from .utils import (
-    ensure_apod_data,
     translate_text_auto,
+    pop_prefetched_image,
     is_valid_date_format,
     is_valid_time_format,
+    backfill_apod_archive,
     fetch_apod_data_by_date,
     fetch_randomly_apod_data,
-    fetch_apod_data_by_date_from_mirror,
 )
 
 
 __plugin_meta__ = PluginMetadata(
     name="每日天文一图",
     description="定时发送 NASA 每日提供的天文图片",
-    usage="/apod 状态; /apod 关闭; /apod 开启 13:30",
+    usage="/apod 状态; /apod 关闭; /apod 开启 13:30; /apod 归档 2024-01-01",
     type="application",
     homepage="https://github.com/lyqgzbl/nonebot-plugin-apod",
     config=Config,
@@ -53,10 +54,8 @@ __plugin_meta__ = PluginMetadata(
 
 apod_infopuzzle = plugin_config.apod_infopuzzle
 default_time = plugin_config.apod_default_send_time
-mirror_url = plugin_config.apod_mirror_url
-mirror_api_key = plugin_config.apod_mirror_api_key
-apod_cache_json = store.get_plugin_cache_file("apod.json")
 task_config_file = store.get_plugin_data_file("apod_task_config.json")
+backfill_lock = asyncio.Lock()
 
 
 if not plugin_config.apod_api_key:
@@ -78,11 +77,18 @@ apod_setting = on_alconna(
         Option("状态|status"),
         Option("关闭|stop"),
         Option("开启|start", Args["send_time?#每日一图发送时间", str]),
+        Option(
+            "归档|backfill",
+            Args["start_date#起始日期", str]["end_date?#结束日期", str],
+        ),
         meta=CommandMeta(
             compact=True,
             description="NASA 每日天文图片设置",
             usage=__plugin_meta__.usage,
-            example=("/apod 状态\n/apod 关闭\n/apod 开启 13:30"),
+            example=(
+                "/apod 状态\n/apod 关闭\n/apod 开启 13:30\n"
+                "/apod 归档 2024-01-01 2024-12-31"
+            ),
         ),
     ),
     block=True,
@@ -148,33 +154,30 @@ date_apod_command = on_alconna(
 
 @apod_command.handle()
 async def apod_command_handle():
-    if not await ensure_apod_data():
+    content = await prepare_apod_content()
+    data = content.record
+    if not data:
         await apod_command.finish("获取今日天文一图失败请稍后再试")
-    async with aiofiles.open(apod_cache_json, encoding="utf-8") as f:
-        data = json.loads(await f.read())
-    if data.get("media_type") != "image" or "url" not in data:
+    if not data.is_image:
         await apod_command.finish("今日 NASA 提供的为天文视频")
     if not apod_infopuzzle:
-        explanation = await translate_text_auto(data["explanation"])
         await (
             UniMessage.text("今日天文一图为")
-            .image(url=data["url"])
+            .image(url=data.url)
             .finish(
                 reply_to=True,
                 argot={
                     "name": "explanation",
-                    "segment": Text(explanation),
+                    "segment": Text(content.explanation or data.explanation),
                     "command": "简介",
                     "expired_at": 360,
                 },
             )
         )
-    cache_image = await get_cache_image() or await generate_apod_image()
-    if not cache_image:
+    if not content.image:
         await apod_command.finish("发送今日的天文一图失败")
-    await set_cache_image(cache_image)
-    url = data.get("hdurl", data["url"]) if plugin_config.apod_hd_image else data["url"]
-    await UniMessage.image(raw=cache_image).send(
+    url = data.image_url(plugin_config.apod_hd_image)
+    await UniMessage.image(raw=content.image).send(
         reply_to=True,
         argot={
             "name": "background",
@@ -187,8 +190,8 @@ async def apod_command_handle():
 
 @apod_setting.assign("status")
 async def apod_status(target: MsgTarget):
-    job_id = generate_job_id(target)
-    job = scheduler.get_job(job_id)
+    task = await get_apod_task(target)
+    job = scheduler.get_job(generate_slot_job_id(task["send_time"])) if task else None
     if not job:
         await apod_setting.finish("NASA 每日天文一图定时任务未开启")
     next_run = (
@@ -223,6 +226,26 @@ async def apod_start(send_time: Match[str], target: MsgTarget):
         await apod_setting.finish("设置 NASA 每日天文一图定时任务时发生错误")
 
 
+@apod_setting.assign("backfill")
+async def apod_backfill(start_date: str, end_date: Match[str]):
+    end = end_date.result if end_date.available else datetime.now().strftime("%Y-%m-%d")
+    if not (is_valid_date_format(start_date) and is_valid_date_format(end)):
+        await apod_setting.finish(
+            "日期格式不正确,请使用 YYYY-MM-DD 格式,且日期需要在 1995-06-16 之后"
+        )
+    if start_date > end:
+        await apod_setting.finish("起始日期不能晚于结束日期")
+    if backfill_lock.locked():
+        await apod_setting.finish("已有归档任务正在进行")
+    async with backfill_lock:
+        await apod_setting.send(f"开始归档 {start_date} 至 {end} 的天文一图")
+        added = await backfill_apod_archive(
+            datetime.fromisoformat(start_date).date(),
+            datetime.fromisoformat(end).date(),
+        )
+    await apod_setting.finish(f"归档完成, 新增 {added} 条天文一图记录")
+
+
 @randomly_apod_command.handle()
 async def randomly_apod_command_handle():
     data = await fetch_randomly_apod_data()
@@ -231,7 +254,11 @@ async def randomly_apod_command_handle():
     if data.get("media_type") != "image" or "url" not in data:
         await randomly_apod_command.finish("随机到了天文视频")
     explanation = await translate_text_auto(data["explanation"])
-    await UniMessage.image(url=data["url"]).send(
+    image = pop_prefetched_image(data["url"])
+    message = (
+        UniMessage.image(raw=image) if image else UniMessage.image(url=data["url"])
+    )
+    await message.send(
         reply_to=True,
         argot={
             "name": "randomly_apod_explanation",
@@ -248,15 +275,7 @@ async def date_apod_command_handle(date: str):
         await date_apod_command.finish(
             "日期格式不正确,请使用 YYYY-MM-DD 格式,且日期需要在 1995-06-16 之后"
         )
-    if mirror_url and mirror_api_key:
-        data = await fetch_apod_data_by_date_from_mirror(
-            mirror_url, mirror_api_key, date
-        )
-        if not data:
-            data = await fetch_apod_data_by_date(date=date)
-            logger.warning("镜像获取指定日期天文一图失败, 回退到 NASA API")
-    else:
-        data = await fetch_apod_data_by_date(date=date)
+    data = await fetch_apod_data_by_date(date)
     if not data:
         await date_apod_command.finish("获取指定日期天文一图失败,请稍后再试。")
     if data.get("media_type") != "image" or "url" not in data:
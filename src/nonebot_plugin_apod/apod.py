@@ -1,18 +1,30 @@
 import json
+import time
 import asyncio
 import hashlib
-from datetime import timedelta
+from functools import partial
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 
 import aiofiles
 from nonebot.log import logger
 import nonebot_plugin_localstore as store
 from nonebot_plugin_apscheduler import scheduler
+from nonebot.adapters import Bot
 from nonebot import get_bot, get_driver
 from nonebot_plugin_argot import Text, Image, add_argot, get_message_id
 from nonebot_plugin_alconna.uniseg import MsgTarget, Target, UniMessage
 
+from .models import ApodRecord
+from .sender import get_send_queue
+from .media import send_image_once, clear_image_handles
 from .infopuzzle import generate_apod_image
-from .utils import translate_text_auto, ensure_apod_data
+from .utils import (
+    ensure_apod_data,
+    clear_apod_records,
+    translate_text_auto,
+    clear_prefetched_images,
+)
 from .config import plugin_config, get_cache_image, set_cache_image, clear_cache_image
 
 
@@ -21,6 +33,12 @@ config_lock = asyncio.Lock()
 baidu_trans = plugin_config.apod_baidu_trans
 deepl_trans = plugin_config.apod_deepl_trans
 apod_infopuzzle = plugin_config.apod_infopuzzle
+prewarm_lead_minutes = plugin_config.apod_prewarm_lead_minutes
+broadcast_concurrency = plugin_config.apod_broadcast_concurrency
+SLOT_JOB_PREFIX = "send_apod_slot_"
+PREWARM_JOB_ID = "apod_prewarm"
+# 每日 12:00 清除缓存, 预热需要在此之后进行才有效
+CACHE_CLEAR_MINUTE = 12 * 60
 apod_cache_json = store.get_plugin_cache_file("apod.json")
 task_config_file = store.get_plugin_data_file("apod_task_config.json")
 
@@ -30,12 +48,6 @@ async def init_apod_tasks():
     await restore_apod_tasks()
 
 
-def generate_job_id(target: MsgTarget) -> str:
-    serialized_target = json.dumps(Target.dump(target), sort_keys=True)
-    job_id = hashlib.md5(serialized_target.encode()).hexdigest()
-    return f"send_apod_task_{job_id}"
-
-
 async def save_task_configs(tasks: list, locked: bool = False):
     async def _save():
         serialized_tasks = [
@@ -61,17 +73,15 @@ async def save_task_configs(tasks: list, locked: bool = False):
 
 
 async def remove_apod_task(target: MsgTarget):
-    job_id = generate_job_id(target)
-    job = scheduler.get_job(job_id)
-    if not job:
-        logger.debug(f"未找到 NASA 每日天文一图定时任务 (目标: {target})")
-        return
-    scheduler.remove_job(job_id)
-    logger.debug(f"已移除 NASA 每日天文一图定时任务 (目标: {target})")
     async with config_lock:
         tasks = await load_task_configs(locked=True)
-        tasks = [task for task in tasks if task["target"] != target]
-        await save_task_configs(tasks, locked=True)
+        remaining = [task for task in tasks if task["target"] != target]
+        if len(remaining) == len(tasks):
+            logger.debug(f"未找到 NASA 每日天文一图定时任务 (目标: {target})")
+            return
+        await save_task_configs(remaining, locked=True)
+    sync_apod_jobs(remaining)
+    logger.debug(f"已移除 NASA 每日天文一图定时任务 (目标: {target})")
 
 
 async def load_task_configs(locked: bool = False) -> list[dict]:
@@ -101,56 +111,87 @@ async def load_task_configs(locked: bool = False) -> list[dict]:
         return []
 
 
-async def send_apod(target: MsgTarget):
-    logger.debug(f"主动发送目标: {target}")
-    try:
-        bot = get_bot(target.self_id)
-    except Exception:
-        logger.opt(colors=True).warning(
-            "<yellow>未找到可用的机器人实例，此任务将被跳过</yellow>"
+@dataclass(frozen=True, slots=True)
+class ApodContent:
+    record: ApodRecord | None
+    explanation: str | None = None
+    image: bytes | None = None
+    image_digest: str = ""
+
+
+@dataclass(slots=True)
+class BroadcastStats:
+    send_time: str
+    total: int
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+    @property
+    def finished(self) -> int:
+        return self.succeeded + self.failed + self.skipped
+
+
+async def prepare_apod_content() -> ApodContent:
+    data = await ensure_apod_data()
+    if not data or not data.is_image:
+        return ApodContent(data)
+    if not apod_infopuzzle:
+        return ApodContent(
+            data, explanation=await translate_text_auto(data.explanation)
         )
-        return
-    if not await ensure_apod_data():
-        await UniMessage.text("未能获取到今日的天文一图，请稍后再试。").send(
-            target=target,
-            bot=bot,
+    cache_image = await get_cache_image(data.date)
+    if not cache_image:
+        result = await generate_apod_image()
+        if not result:
+            return ApodContent(data)
+        cache_image = result.image
+        # 降级渲染的图片不放入内存缓存, 以便下次重新渲染完整的版本
+        if not result.degraded:
+            await set_cache_image(data.date, cache_image)
+    digest = hashlib.sha1(cache_image).hexdigest()
+    return ApodContent(data, image=cache_image, image_digest=digest)
+
+
+async def _send(message: UniMessage, target: Target, bot: Bot):
+    return await get_send_queue(bot.self_id).submit(
+        partial(message.send, target=target, bot=bot)
+    )
+
+
+async def deliver_apod(target: Target, bot: Bot, content: ApodContent):
+    data = content.record
+    if not data:
+        await _send(
+            UniMessage.text("未能获取到今日的天文一图，请稍后再试。"), target, bot
         )
         return
-    async with aiofiles.open(apod_cache_json, encoding="utf-8") as f:
-        data = json.loads(await f.read())
-    if data.get("media_type") != "image" or "url" not in data:
-        await UniMessage.text("今日 NASA 提供的为天文视频").send(target=target, bot=bot)
+    if not data.is_image:
+        await _send(UniMessage.text("今日 NASA 提供的为天文视频"), target, bot)
         return
     if not apod_infopuzzle:
-        explanation = await translate_text_auto(data["explanation"])
-        message = (
-            await UniMessage.text("今日天文一图为")
-            .image(url=data["url"])
-            .send(
-                target=target,
-                bot=bot,
-            )
+        message = await _send(
+            UniMessage.text("今日天文一图为").image(url=data.url), target, bot
         )
         await add_argot(
             message_id=get_message_id(message) or "",
             name="explanation",
             command="简介",
-            segment=Text(explanation),
+            segment=Text(content.explanation or data.explanation),
             expired_at=timedelta(minutes=2),
         )
         return
-    cache_image = await get_cache_image() or await generate_apod_image()
-    if not cache_image:
-        await UniMessage.text("发送今日的天文一图失败，请稍后再试。").send(
-            target=target,
-            bot=bot,
+    if not content.image:
+        await _send(
+            UniMessage.text("发送今日的天文一图失败，请稍后再试。"), target, bot
         )
         return
-    await set_cache_image(cache_image)
-    url = data.get("hdurl", data["url"]) if plugin_config.apod_hd_image else data["url"]
-    message = await UniMessage.image(raw=cache_image).send(
-        target=target,
-        bot=bot,
+    url = data.image_url(plugin_config.apod_hd_image)
+    message = await send_image_once(
+        bot,
+        content.image,
+        content.image_digest,
+        lambda image: _send(UniMessage(image), target, bot),
     )
     await add_argot(
         message_id=get_message_id(message) or "",
@@ -161,29 +202,104 @@ async def send_apod(target: MsgTarget):
     )
 
 
-async def schedule_apod_task(send_time: str, target: MsgTarget):
-    try:
+async def broadcast_apod(send_time: str) -> BroadcastStats:
+    tasks = await load_task_configs()
+    targets = [
+        task["target"]
+        for task in tasks
+        if task["send_time"] and normalize_send_time(task["send_time"]) == send_time
+    ]
+    stats = BroadcastStats(send_time=send_time, total=len(targets))
+    if not targets:
+        return stats
+    logger.info(
+        f"开始发送 {send_time} 批次的 NASA 每日天文一图, 共 {stats.total} 个目标"
+    )
+    start = time.perf_counter()
+    # 整个批次共享一次获取与渲染, 避免各目标并发争抢缓存
+    content = await prepare_apod_content()
+    semaphore = asyncio.Semaphore(max(broadcast_concurrency, 1))
+    progress_step = max(stats.total // 10, 1)
+
+    async def _deliver(target: Target):
+        async with semaphore:
+            try:
+                bot = get_bot(target.self_id)
+            except Exception:
+                stats.skipped += 1
+                logger.debug(f"未找到可用的机器人实例, 跳过目标: {target}")
+            else:
+                try:
+                    await deliver_apod(target, bot, content)
+                    stats.succeeded += 1
+                except Exception as e:
+                    stats.failed += 1
+                    logger.warning(f"发送 NASA 每日天文一图失败 (目标: {target}): {e}")
+            if stats.finished % progress_step == 0 and stats.finished < stats.total:
+                logger.debug(f"{send_time} 批次进度: {stats.finished}/{stats.total}")
+
+    await asyncio.gather(*(_deliver(target) for target in targets))
+    logger.info(
+        f"{send_time} 批次发送完成: 成功 {stats.succeeded}, 失败 {stats.failed}, "
+        f"跳过 {stats.skipped}, 耗时 {time.perf_counter() - start:.1f}s"
+    )
+    return stats
+
+
+def normalize_send_time(send_time: str) -> str:
+    hour, minute = map(int, send_time.split(":"))
+    return f"{hour:02d}:{minute:02d}"
+
+
+def generate_slot_job_id(send_time: str) -> str:
+    return SLOT_JOB_PREFIX + normalize_send_time(send_time).replace(":", "")
+
+
+def sync_apod_jobs(tasks: list[dict]):
+    send_times = {
+        normalize_send_time(task["send_time"])
+        for task in tasks
+        if task["send_time"] and task["target"]
+    }
+    job_ids = set()
+    for send_time in send_times:
         hour, minute = map(int, send_time.split(":"))
-        job_id = generate_job_id(target)
+        job_id = generate_slot_job_id(send_time)
+        job_ids.add(job_id)
         scheduler.add_job(
-            func=send_apod,
+            func=broadcast_apod,
             trigger="cron",
-            args=[target],
+            args=[send_time],
             hour=hour,
             minute=minute,
             id=job_id,
             max_instances=1,
             replace_existing=True,
         )
-        logger.info(
-            "已成功设置 NASA 每日天文一图定时任务,"
-            f"发送时间为 {send_time} (目标: {target})"
-        )
+    for job in scheduler.get_jobs():
+        if job.id.startswith(SLOT_JOB_PREFIX) and job.id not in job_ids:
+            scheduler.remove_job(job.id)
+    schedule_prewarm_job(tasks)
+
+
+async def get_apod_task(target: MsgTarget) -> dict | None:
+    tasks = await load_task_configs()
+    return next((task for task in tasks if task["target"] == target), None)
+
+
+async def schedule_apod_task(send_time: str, target: MsgTarget):
+    try:
+        send_time = normalize_send_time(send_time)
         async with config_lock:
             tasks = await load_task_configs(locked=True)
             tasks = [task for task in tasks if task["target"] != target]
             tasks.append({"send_time": send_time, "target": target})
             await save_task_configs(tasks, locked=True)
+        sync_apod_jobs(tasks)
+        logger.info(
+            "已成功设置 NASA 每日天文一图定时任务,"
+            f"发送时间为 {send_time} (目标: {target})"
+        )
     except ValueError:
         logger.error(f"时间格式错误：{send_time}，请使用 HH:MM 格式")
         raise ValueError(f"时间格式错误：{send_time}") from None
@@ -197,27 +313,64 @@ async def restore_apod_tasks():
         if not tasks:
             logger.debug("没有找到任何 NASA 每日天文一图定时任务配置")
             return
-        for task in tasks:
-            send_time = task["send_time"]
-            target = task["target"]
-            if send_time and target:
-                hour, minute = map(int, send_time.split(":"))
-                job_id = generate_job_id(target)
-                scheduler.add_job(
-                    func=send_apod,
-                    trigger="cron",
-                    args=[target],
-                    hour=hour,
-                    minute=minute,
-                    id=job_id,
-                    max_instances=1,
-                    replace_existing=True,
-                )
+        sync_apod_jobs(tasks)
         logger.debug("已恢复所有 NASA 每日天文一图定时任务")
     except Exception as e:
         logger.error(f"恢复 NASA 每日天文一图定时任务时发生错误：{e}")
 
 
+def get_prewarm_time(
+    send_times: list[str], lead_minutes: int
+) -> tuple[int, int] | None:
+    if lead_minutes <= 0 or not send_times:
+        return None
+
+    def _minutes_after_clear(send_time: str) -> int:
+        hour, minute = map(int, send_time.split(":"))
+        return (hour * 60 + minute - CACHE_CLEAR_MINUTE) % (24 * 60)
+
+    # 以缓存清除时间为一天的起点, 找到清除后最早的发送时间
+    earliest = min(_minutes_after_clear(send_time) for send_time in send_times)
+    run_at = (CACHE_CLEAR_MINUTE + max(earliest - lead_minutes, 1)) % (24 * 60)
+    return divmod(run_at, 60)
+
+
+def schedule_prewarm_job(tasks: list[dict]):
+    prewarm_time = get_prewarm_time(
+        [task["send_time"] for task in tasks if task["send_time"]],
+        prewarm_lead_minutes,
+    )
+    if prewarm_time is None:
+        if scheduler.get_job(PREWARM_JOB_ID):
+            scheduler.remove_job(PREWARM_JOB_ID)
+        return
+    hour, minute = prewarm_time
+    scheduler.add_job(
+        func=prewarm_apod,
+        trigger="cron",
+        hour=hour,
+        minute=minute,
+        id=PREWARM_JOB_ID,
+        max_instances=1,
+        replace_existing=True,
+    )
+    logger.debug(f"已设置天文一图预热任务, 预热时间为 {hour:02d}:{minute:02d}")
+
+
+async def prewarm_apod():
+    try:
+        # 预热可能早于 NASA 的日期切换, 此时拿到的是前一天的数据, 不应渲染并缓存
+        data = await ensure_apod_data()
+        if data and data.date != datetime.now().strftime("%Y-%m-%d"):
+            logger.debug(f"今日天文一图尚未发布（{data.date}）, 跳过预热")
+            return
+        content = await prepare_apod_content()
+        if content.record:
+            logger.debug("天文一图预热完成")
+    except Exception as e:
+        logger.error(f"预热天文一图时发生错误：{e}")
+
+
 @scheduler.scheduled_job("cron", hour=12, minute=0, id="apod_clear_cache")
 async def apod_clea_cache():
     try:
@@ -226,7 +379,10 @@ async def apod_clea_cache():
             logger.debug("apod 缓存 JSON 已清除")
         else:
             logger.debug("apod 缓存 JSON 不存在")
+        clear_apod_records()
+        clear_prefetched_images()
         await clear_cache_image()
+        clear_image_handles()
         logger.debug("apod 图片缓存已清除")
     except Exception as e:
         logger.error(f"清除 apod 缓存时发生错误：{e}")
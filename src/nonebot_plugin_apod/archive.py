@@ -0,0 +1,104 @@
+import json
+import asyncio
+import sqlite3
+import threading
+
+from nonebot.log import logger
+from nonebot import get_driver
+import nonebot_plugin_localstore as store
+
+
+archive_db_file = store.get_plugin_data_file("archive.db")
+
+_db: sqlite3.Connection | None = None
+_db_lock = threading.Lock()
+
+driver = get_driver()
+
+
+def _get_db() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(archive_db_file, check_same_thread=False)
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS apod ("
+            "date TEXT PRIMARY KEY, media_type TEXT, data TEXT NOT NULL)"
+        )
+        _db.commit()
+    return _db
+
+
+def _db_get(date: str) -> dict | None:
+    with _db_lock:
+        row = (
+            _get_db()
+            .execute("SELECT data FROM apod WHERE date = ?", (date,))
+            .fetchone()
+        )
+    return json.loads(row[0]) if row else None
+
+
+def _db_put(records: list[dict]) -> int:
+    rows = [
+        (r["date"], r.get("media_type"), json.dumps(r, ensure_ascii=False))
+        for r in records
+        if isinstance(r, dict) and r.get("date")
+    ]
+    with _db_lock:
+        db = _get_db()
+        before = db.total_changes
+        db.executemany(
+            "INSERT OR IGNORE INTO apod (date, media_type, data) VALUES (?, ?, ?)",
+            rows,
+        )
+        db.commit()
+        return db.total_changes - before
+
+
+def _db_count(start: str, end: str) -> int:
+    with _db_lock:
+        row = (
+            _get_db()
+            .execute(
+                "SELECT COUNT(*) FROM apod WHERE date BETWEEN ? AND ?", (start, end)
+            )
+            .fetchone()
+        )
+    return row[0]
+
+
+async def get_archived_apod(date: str) -> dict | None:
+    try:
+        return await asyncio.to_thread(_db_get, date)
+    except (sqlite3.Error, json.JSONDecodeError) as e:
+        logger.warning(f"读取天文一图归档失败: {e}")
+        return None
+
+
+async def archive_apod_records(records: list[dict]) -> int:
+    try:
+        return await asyncio.to_thread(_db_put, records)
+    except sqlite3.Error as e:
+        logger.warning(f"写入天文一图归档失败: {e}")
+        return 0
+
+
+async def count_archived_apod(start: str, end: str) -> int:
+    try:
+        return await asyncio.to_thread(_db_count, start, end)
+    except sqlite3.Error as e:
+        logger.warning(f"读取天文一图归档失败: {e}")
+        return 0
+
+
+def close_archive_db():
+    global _db
+    with _db_lock:
+        if _db is not None:
+            _db.close()
+            _db = None
+
+
+@driver.on_shutdown
+async def _close_archive_db():
+    close_archive_db()
@@ -1,47 +1,129 @@
 from asyncio import Lock
+from typing import Any, Literal
+
 from pydantic import BaseModel
 
 from nonebot import get_plugin_config
+from nonebot.compat import model_validator
+
+
+DEFAULT_TRANSLATE_TIMEOUT = 8.0
+# 渲染等待翻译时在整个回退链的预算之外额外留出的时间
+RENDER_TRANSLATE_MARGIN = 1.0
+
+
+class MirrorConfig(BaseModel):
+    url: str
+    api_key: str | None = None
+    supports_ranges: bool = False
 
 
 class Config(BaseModel):
     apod_api_key: str | None = None
     apod_default_send_time: str = "13:00"
     apod_hd_image: bool = False
+    apod_image_max_mb: int = 30
     apod_baidu_trans: bool = False
     apod_baidu_trans_appid: int | None = None
     apod_baidu_trans_api_key: str | None = None
     apod_infopuzzle: bool = True
     apod_infopuzzle_dark_mode: bool = False
+    apod_infopuzzle_format: Literal["png", "jpeg", "webp"] = "png"
+    apod_infopuzzle_quality: int = 85
+    apod_infopuzzle_max_kb: int = 0
+    apod_render_executor: Literal["thread", "process"] = "thread"
+    apod_render_workers: int = 2
+    apod_render_translate_timeout: float = (
+        DEFAULT_TRANSLATE_TIMEOUT + RENDER_TRANSLATE_MARGIN
+    )
+    apod_render_download_timeout: float = 20.0
+    apod_render_cache_max_mb: int = 64
+    apod_http_cache_max_mb: int = 128
     apod_deepl_trans: bool = False
     apod_deepl_trans_api_key: str | None = None
     apod_qwen_trans: bool = False
     apod_qwen_mt_model_name: str = "qwen-mt-flash"
     apod_qwen_mt_api_key: str | None = None
     apod_qwen_mt_api_url: str = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+    apod_qwen_mt_stream: bool = False
+    apod_qwen_mt_incremental_output: bool = False
+    apod_translation_cache_size: int = 256
+    apod_translator_order: list[Literal["qwen", "deepl", "baidu"]] = [
+        "qwen",
+        "deepl",
+        "baidu",
+    ]
+    apod_translate_timeout: float = DEFAULT_TRANSLATE_TIMEOUT
+    apod_translate_race: int = 0
+    apod_translate_backend_timeout: float = 5.0
+    apod_translate_segment_chars: int = 600
+    apod_translate_concurrency: int = 4
     apod_mirror_url: str | None = None
     apod_mirror_api_key: str | None = None
+    apod_mirrors: list[MirrorConfig] = []
+    apod_upstream_failure_threshold: int = 3
+    apod_upstream_cooldown: int = 60
+    apod_backfill_chunk_days: int = 30
+    apod_backfill_interval: float = 4.0
+    apod_backfill_translate: bool = False
+    apod_random_pool_size: int = 20
+    apod_random_pool_low_water: int = 5
+    apod_prefetch_images: bool = False
+    apod_prefetch_image_max_mb: int = 5
+    apod_fetch_failure_ttl: int = 30
+    apod_hedge_requests: bool = True
+    apod_hedge_percentile: float = 0.9
+    apod_hedge_delay: float = 2.0
+    apod_prewarm_lead_minutes: int = 10
+    apod_broadcast_concurrency: int = 8
+    apod_send_rate: float = 2.0
+    apod_send_burst: int = 3
+    apod_send_bot_concurrency: int = 2
+    apod_send_retries: int = 2
+    apod_send_retry_backoff: float = 1.0
+
+    @model_validator(mode="before")
+    def _check_translate_timeouts(cls, values: Any) -> Any:
+        if not isinstance(values, dict):
+            return values
+        budget = float(values.get("apod_translate_timeout", DEFAULT_TRANSLATE_TIMEOUT))
+        render_timeout = values.get("apod_render_translate_timeout")
+        if render_timeout is None:
+            # 未配置时随翻译预算调整, 保证回退链中的备用翻译服务有机会返回
+            return {
+                **values,
+                "apod_render_translate_timeout": budget + RENDER_TRANSLATE_MARGIN,
+            }
+        if float(render_timeout) < budget:
+            raise ValueError(
+                "apod_render_translate_timeout 不能小于 apod_translate_timeout, "
+                "否则翻译回退链尚未用尽渲染就已降级"
+            )
+        return values
 
 
 plugin_config = get_plugin_config(Config)
 
 
 # 缓存天文一图图片
-cache_image = None
+# 内存中只保留一张渲染图, 以记录日期为键, 避免日期切换后继续发送旧图
+cache_image: tuple[str, bytes] | None = None
 cache_lock = Lock()
 
 
 # 获取缓存图片
-async def get_cache_image():
+async def get_cache_image(date: str) -> bytes | None:
     async with cache_lock:
-        return cache_image
+        if cache_image and cache_image[0] == date:
+            return cache_image[1]
+        return None
 
 
 # 设置缓存图片
-async def set_cache_image(image):
+async def set_cache_image(date: str, image: bytes):
     global cache_image
     async with cache_lock:
-        cache_image = image
+        cache_image = (date, image)
 
 
 # 清除缓存图片
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import contextlib
+from pathlib import Path
+
+from nonebot.log import logger
+
+
+def read_and_touch(path: Path) -> bytes | None:
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    # 更新修改时间作为最近使用时间, 供 LRU 淘汰使用
+    with contextlib.suppress(OSError):
+        os.utime(path)
+    return data
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # 同一进程内的多个线程可能同时写入同一文件, 临时文件名必须唯一
+    fd, tmp = tempfile.mkstemp(prefix=f"{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    finally:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+
+
+def evict_lru(directory: Path, pattern: str, max_bytes: int):
+    entries = []
+    for path in directory.glob(pattern):
+        with contextlib.suppress(OSError):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        with contextlib.suppress(OSError):
+            path.unlink()
+            total -= size
+            logger.debug(f"已淘汰缓存文件 {path.name}")
@@ -0,0 +1,78 @@
+import asyncio
+import contextlib
+from typing import TypeVar
+from collections import deque
+from collections.abc import Callable, Awaitable
+
+from nonebot.log import logger
+
+
+T = TypeVar("T")
+MIN_SAMPLES = 5
+
+
+class LatencyTracker:
+    def __init__(self, size: int = 50):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        if len(self._samples) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        index = min(int(q * len(ordered)), len(ordered) - 1)
+        return ordered[index]
+
+
+def _succeeded(task: asyncio.Task) -> bool:
+    return (
+        not task.cancelled() and task.exception() is None and task.result() is not None
+    )
+
+
+async def _cancel(tasks: set[asyncio.Task]):
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await task
+
+
+async def _first_success(tasks: set[asyncio.Task[T | None]]) -> T | None:
+    pending = tasks
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if _succeeded(task):
+                    return task.result()
+        return None
+    finally:
+        await _cancel(pending)
+
+
+async def hedged(
+    primary: Callable[[], Awaitable[T | None]],
+    secondary: Callable[[], Awaitable[T | None]],
+    delay: float,
+) -> T | None:
+    first = asyncio.create_task(primary())
+    try:
+        await asyncio.wait({first}, timeout=delay)
+    except asyncio.CancelledError:
+        await _cancel({first})
+        raise
+    if first.done() and _succeeded(first):
+        return first.result()
+    if not first.done():
+        logger.debug(f"首选上游 {delay:.2f}s 内未响应, 并行请求备用上游")
+    # 取两者中最先返回的有效结果, 另一方随后被取消
+    return await _first_success({first, asyncio.create_task(secondary())})
+
+
+async def race(calls: list[Callable[[], Awaitable[T | None]]]) -> T | None:
+    return await _first_success({asyncio.create_task(call()) for call in calls})
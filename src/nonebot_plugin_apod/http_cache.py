@@ -0,0 +1,102 @@
+import json
+import asyncio
+import hashlib
+from typing import Any
+
+import httpx
+from nonebot.log import logger
+import nonebot_plugin_localstore as store
+
+from .config import plugin_config
+from .diskcache import evict_lru, read_and_touch, atomic_write_bytes
+
+
+http_cache_dir = store.get_plugin_cache_dir() / "http"
+http_cache_max_bytes = plugin_config.apod_http_cache_max_mb * 1024 * 1024
+# 缓存命中时重建响应所保留的响应头, 其余(如 Content-Encoding)与已解码的内容不再匹配
+KEPT_HEADERS = ("content-type", "etag", "last-modified")
+
+
+class ResponseTooLarge(Exception):
+    pass
+
+
+def _cache_key(url: str, params: dict[str, Any] | None) -> str:
+    request = httpx.Request("GET", url, params=params)
+    return hashlib.sha256(str(request.url).encode()).hexdigest()
+
+
+def _load_entry(key: str) -> tuple[dict[str, str], bytes] | None:
+    data = read_and_touch(http_cache_dir / f"{key}.http")
+    if data is None:
+        return None
+    header, _, body = data.partition(b"\n")
+    try:
+        return json.loads(header), body
+    except json.JSONDecodeError:
+        return None
+
+
+def _save_entry(key: str, headers: dict[str, str], body: bytes):
+    header = json.dumps(headers, ensure_ascii=False).encode()
+    atomic_write_bytes(http_cache_dir / f"{key}.http", header + b"\n" + body)
+    evict_lru(http_cache_dir, "*.http", http_cache_max_bytes)
+
+
+async def _read_body(response: httpx.Response, max_bytes: int) -> bytes:
+    length = int(response.headers.get("Content-Length") or 0)
+    if max_bytes and length > max_bytes:
+        raise ResponseTooLarge(f"响应体过大 ({length} 字节)")
+    buf = bytearray()
+    async for chunk in response.aiter_bytes():
+        buf.extend(chunk)
+        if max_bytes and len(buf) > max_bytes:
+            raise ResponseTooLarge(f"响应体超过 {max_bytes} 字节")
+    return bytes(buf)
+
+
+async def conditional_get(
+    client: httpx.AsyncClient,
+    url: str,
+    *,
+    params: dict[str, Any] | None = None,
+    headers: dict[str, str] | None = None,
+    timeout: float | None = None,
+    max_bytes: int = 0,
+) -> httpx.Response:
+    enabled = http_cache_max_bytes > 0
+    key = _cache_key(url, params)
+    entry = await asyncio.to_thread(_load_entry, key) if enabled else None
+    request_headers = dict(headers or {})
+    if entry:
+        cached_headers, _ = entry
+        if etag := cached_headers.get("etag"):
+            request_headers["If-None-Match"] = etag
+        if last_modified := cached_headers.get("last-modified"):
+            request_headers["If-Modified-Since"] = last_modified
+    extra = {} if timeout is None else {"timeout": timeout}
+    async with client.stream(
+        "GET", url, params=params, headers=request_headers, **extra
+    ) as resp:
+        if resp.status_code == 304 and entry:
+            logger.debug(f"HTTP 缓存命中: {resp.url}")
+            cached_headers, body = entry
+            return httpx.Response(
+                200, headers=cached_headers, content=body, request=resp.request
+            )
+        body = await _read_body(resp, max_bytes)
+        kept = {k: v for k in KEPT_HEADERS if (v := resp.headers.get(k))}
+        response = httpx.Response(
+            resp.status_code, headers=kept, content=body, request=resp.request
+        )
+    if (
+        enabled
+        and response.status_code == 200
+        and ("etag" in kept or "last-modified" in kept)
+        and len(body) <= http_cache_max_bytes
+    ):
+        try:
+            await asyncio.to_thread(_save_entry, key, kept, body)
+        except OSError as e:
+            logger.warning(f"写入 HTTP 缓存失败: {e}")
+    return response
@@ -1,17 +1,35 @@
-import json
+import time
+import asyncio
+import multiprocessing
 from io import BytesIO
+from pathlib import Path
+from typing import Any, TypeVar
+from dataclasses import dataclass
+from weakref import WeakKeyDictionary
+from collections.abc import Callable, Awaitable
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
 
 import aiofiles
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, features
 from nonebot.log import logger
 from nonebot import get_driver
 import nonebot_plugin_localstore as store
 
 from .config import plugin_config
-from .utils import ensure_apod_data, translate_text_auto, get_httpx_client
+from .http_cache import ResponseTooLarge, conditional_get
+from .render_cache import render_cache_key, get_rendered_image, put_rendered_image
+from .utils import (
+    ensure_apod_data,
+    get_httpx_client,
+    translate_with_backend,
+    get_cached_translation_text,
+)
 
 
+T = TypeVar("T")
 FontLike = ImageFont.FreeTypeFont | ImageFont.ImageFont
+# 修改渲染布局或样式时递增, 使旧的渲染缓存失效
+RENDER_VERSION = 3
 SCALE = 2
 CANVAS_WIDTH = 600 * SCALE
 PADDING = 35 * SCALE
@@ -29,10 +47,28 @@ FONTS = {
     "regular": "HarmonyOS_SansSC_Regular.ttf",
     "bold": "HarmonyOS_SansSC_Bold.ttf",
 }
+TITLE_FONT = (28 * SCALE, True)
+SUBTITLE_FONT = (26 * SCALE, True)
+BODY_FONT = (20 * SCALE, False)
+INFO_FONT = (14 * SCALE, False)
+FONT_SPECS = (TITLE_FONT, SUBTITLE_FONT, BODY_FONT, INFO_FONT)
 
 data_dir = store.get_plugin_data_dir()
-apod_cache_json = store.get_plugin_cache_file("apod.json")
 dark_mode = plugin_config.apod_infopuzzle_dark_mode
+render_executor_mode = plugin_config.apod_render_executor
+output_format = plugin_config.apod_infopuzzle_format
+output_quality = plugin_config.apod_infopuzzle_quality
+output_max_bytes = plugin_config.apod_infopuzzle_max_kb * 1024
+MIN_QUALITY = 30
+translate_stage_timeout = plugin_config.apod_render_translate_timeout
+download_stage_timeout = plugin_config.apod_render_download_timeout
+# 最近一次渲染各阶段的耗时(秒)
+last_stage_timings: dict[str, float] = {}
+image_max_bytes = plugin_config.apod_image_max_mb * 1024 * 1024
+_render_executor: Executor | None = None
+_font_cache: dict[tuple[str, int], ImageFont.FreeTypeFont] = {}
+_line_height_cache: WeakKeyDictionary[FontLike, int] = WeakKeyDictionary()
+_advance_cache: WeakKeyDictionary[FontLike, dict[str, float]] = WeakKeyDictionary()
 
 THEMES = {
     False: {
@@ -53,6 +89,12 @@ THEMES = {
 
 driver = get_driver()
 
+if output_format == "webp" and not features.check("webp"):
+    logger.opt(colors=True).warning(
+        "<yellow>当前 Pillow 不支持 WebP 编码, 信息拼图已回退为 PNG 格式</yellow>"
+    )
+    output_format = "png"
+
 
 @driver.on_startup
 async def _download_fonts():
@@ -71,42 +113,121 @@ async def _download_fonts():
             logger.info(f"HarmonyOS Sans SC {name} 下载完成")
         except Exception as e:
             logger.warning(f"下载 HarmonyOS Sans SC {name} 失败: {e}")
+    await asyncio.to_thread(_preload_fonts)
+
+
+def _preload_fonts():
+    draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    for size, bold in FONT_SPECS:
+        font = _load_font(size, bold=bold)
+        if font is None:
+            logger.debug("字体文件缺失, 跳过字体预加载")
+            return
+        _line_height(draw, font)
+    logger.debug("信息拼图字体预加载完成")
+
+
+def _truetype(path: Path, size: int) -> ImageFont.FreeTypeFont:
+    key = (str(path), size)
+    font = _font_cache.get(key)
+    if font is None:
+        font = _font_cache[key] = ImageFont.truetype(str(path), size)
+    return font
 
 
 def _load_font(size: int, bold: bool = False) -> ImageFont.FreeTypeFont | None:
     key = "bold" if bold else "regular"
     path = data_dir / FONTS[key]
     if path.exists():
-        return ImageFont.truetype(str(path), size)
+        return _truetype(path, size)
     if bold:
         regular = data_dir / FONTS["regular"]
         if regular.exists():
-            return ImageFont.truetype(str(regular), size)
+            return _truetype(regular, size)
     return None
 
 
+def _char_advances(
+    draw: ImageDraw.ImageDraw,
+    text: str,
+    font: FontLike,
+) -> list[float]:
+    cache = _advance_cache.get(font)
+    if cache is None:
+        cache = _advance_cache[font] = {}
+    advances: list[float] = []
+    for char in text:
+        advance = cache.get(char)
+        if advance is None:
+            advance = cache[char] = draw.textlength(char, font=font)
+        advances.append(advance)
+    return advances
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isascii() and char.isalnum()
+
+
+def _is_latin_text(text: str) -> bool:
+    # 不含中日韩字符的文本(如未翻译的英文简介)按单词换行
+    return all(ord(char) < 0x2E80 for char in text)
+
+
+def _line_end(
+    draw: ImageDraw.ImageDraw,
+    paragraph: str,
+    advances: list[float],
+    start: int,
+    font: FontLike,
+    max_width: int,
+) -> int:
+    # 先按缓存的字形宽度累加估算断点, 再用整行实测校正字距带来的误差
+    end = start
+    width = 0.0
+    while end < len(paragraph) and width + advances[end] <= max_width:
+        width += advances[end]
+        end += 1
+    while (
+        end > start + 1 and draw.textlength(paragraph[start:end], font=font) > max_width
+    ):
+        end -= 1
+    while (
+        end < len(paragraph)
+        and draw.textlength(paragraph[start : end + 1], font=font) <= max_width
+    ):
+        end += 1
+    return max(end, start + 1)
+
+
 def _wrap_text(
     draw: ImageDraw.ImageDraw,
     text: str,
     font: FontLike,
     max_width: int,
+    keep_words: bool = False,
 ) -> list[str]:
     lines: list[str] = []
     for paragraph in text.split("\n"):
         if not paragraph:
             lines.append("")
             continue
-        line = ""
-        for char in paragraph:
-            test = line + char
-            if draw.textlength(test, font=font) > max_width:
-                if line:
-                    lines.append(line)
-                line = char
-            else:
-                line = test
-        if line:
-            lines.append(line)
+        advances = _char_advances(draw, paragraph, font)
+        start = 0
+        while start < len(paragraph):
+            end = _line_end(draw, paragraph, advances, start, font, max_width)
+            if keep_words and end < len(paragraph):
+                for i in range(end, start, -1):
+                    if paragraph[i - 1].isspace() or not (
+                        _is_word_char(paragraph[i - 1]) and _is_word_char(paragraph[i])
+                    ):
+                        end = i
+                        break
+            line = paragraph[start:end]
+            lines.append(line.rstrip(" ") if keep_words else line)
+            start = end
+            if keep_words:
+                while start < len(paragraph) and paragraph[start] == " ":
+                    start += 1
     return lines
 
 
@@ -127,7 +248,12 @@ def _draw_centered_lines(
 
 
 def _line_height(draw: ImageDraw.ImageDraw, font: FontLike) -> int:
-    return int(draw.textbbox((0, 0), "测试Tg", font=font)[3])
+    height = _line_height_cache.get(font)
+    if height is None:
+        height = _line_height_cache[font] = int(
+            draw.textbbox((0, 0), "测试Tg", font=font)[3]
+        )
+    return height
 
 
 def _round_corners(img: Image.Image, radius: int) -> Image.Image:
@@ -139,149 +265,395 @@ def _round_corners(img: Image.Image, radius: int) -> Image.Image:
     return img
 
 
-async def _fetch_image(url: str) -> Image.Image | None:
+async def _fetch_image(url: str) -> bytes | None:
     try:
-        client = get_httpx_client()
-        resp = await client.get(url, timeout=20)
+        resp = await conditional_get(
+            get_httpx_client(), url, timeout=20, max_bytes=image_max_bytes
+        )
         resp.raise_for_status()
-        return Image.open(BytesIO(resp.content)).convert("RGB")
+        return resp.content
+    except ResponseTooLarge as e:
+        logger.warning(f"天文图片过大, 已跳过下载: {e}")
+        return None
     except Exception as e:
         logger.warning(f"下载天文图片失败: {e}")
         return None
 
 
-async def generate_apod_image() -> bytes | None:
+def _decode_image(raw: bytes) -> Image.Image | None:
     try:
-        if not await ensure_apod_data():
-            return None
+        img = Image.open(BytesIO(raw))
+        height = max(int(img.height * CONTENT_WIDTH / img.width), 1)
+        if img.width > CONTENT_WIDTH:
+            # JPEG 可直接按 1/2、1/4、1/8 缩小解码, 避免载入全分辨率像素
+            img.draft("RGB", (CONTENT_WIDTH, height))
+        img = img.convert("RGB")
+        return img.resize(
+            (CONTENT_WIDTH, height),
+            Image.Resampling.LANCZOS,
+            reducing_gap=3.0 if img.width >= CONTENT_WIDTH * 3 else None,
+        )
+    except Exception as e:
+        logger.warning(f"解码天文图片失败: {e}")
+        return None
 
-        font_title = _load_font(28 * SCALE, bold=True)
-        if font_title is None:
-            logger.warning("缺少字体文件, 已降级为单图模式")
-            return None
-        font_subtitle = _load_font(26 * SCALE, bold=True)
-        font_body = _load_font(20 * SCALE)
-        font_info = _load_font(14 * SCALE)
-        if font_subtitle is None or font_body is None or font_info is None:
-            logger.warning("缺少字体文件, 已降级为单图模式")
-            return None
 
-        async with aiofiles.open(apod_cache_json, encoding="utf-8") as f:
-            data = json.loads(await f.read())
-
-        theme = THEMES[dark_mode]
-        title_text = "今日天文一图"
-        subtitle_text = data["title"]
-        explanation = await translate_text_auto(data["explanation"])
-        copyright_text = f"版权：{data.get('copyright', '无')}"
-        date_text = f"日期：{data['date']}"
-        image_url = data.get("url")
-
-        tmp = Image.new("RGB", (1, 1))
-        draw = ImageDraw.Draw(tmp)
-
-        title_lines = _wrap_text(draw, title_text, font_title, CONTENT_WIDTH)
-        subtitle_lines = _wrap_text(draw, subtitle_text, font_subtitle, CONTENT_WIDTH)
-        body_lines = _wrap_text(draw, explanation, font_body, CONTENT_WIDTH)
-
-        title_lh = _line_height(draw, font_title)
-        subtitle_lh = _line_height(draw, font_subtitle)
-        body_lh = _line_height(draw, font_body)
-        info_lh = _line_height(draw, font_info)
-
-        apod_img = await _fetch_image(image_url) if image_url else None
-        img_height = 0
-        if apod_img:
-            ratio = CONTENT_WIDTH / apod_img.width
-            img_height = int(apod_img.height * ratio)
-            apod_img = apod_img.resize(
-                (CONTENT_WIDTH, img_height), Image.Resampling.LANCZOS
+async def _download_image(url: str | None) -> Image.Image | None:
+    if not url or (raw := await _fetch_image(url)) is None:
+        return None
+    return await _run_in_render_pool(_decode_image, raw)
+
+
+def _get_render_executor() -> Executor:
+    global _render_executor
+    if _render_executor is None:
+        workers = plugin_config.apod_render_workers
+        if (
+            render_executor_mode == "process"
+            and "fork" in multiprocessing.get_all_start_methods()
+        ):
+            _render_executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("fork"),
             )
-            apod_img = _round_corners(apod_img, CORNER_RADIUS)
-
-        card_content_h = (
-            25 * SCALE
-            + len(title_lines) * (title_lh + 4 * SCALE)
-            + 25 * SCALE
-            + len(subtitle_lines) * (subtitle_lh + 4 * SCALE)
-            + 20 * SCALE
-            + (img_height + SPACING if apod_img else 0)
-            + len(body_lines) * (body_lh + 6 * SCALE)
-            + 15 * SCALE
-            + info_lh + 5 * SCALE
-            + info_lh
-        )
-        card_height = 2 * CARD_PADDING + card_content_h
-        canvas_height = 2 * PADDING + card_height
-
-        canvas = Image.new("RGBA", (CANVAS_WIDTH, canvas_height), theme["bg"])
-        draw = ImageDraw.Draw(canvas)
-
-        card_x = PADDING
-        card_y = PADDING
-        draw.rounded_rectangle(
-            [card_x, card_y, CANVAS_WIDTH - PADDING, card_y + card_height],
-            radius=CORNER_RADIUS,
-            fill=theme["card_bg"],
-        )
+        else:
+            if render_executor_mode == "process":
+                logger.warning("当前平台不支持 fork, 渲染已回退为线程池模式")
+            _render_executor = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix="apod-render",
+            )
+    return _render_executor
 
-        y = card_y + CARD_PADDING
-        y += 25 * SCALE
-        y = _draw_centered_lines(
-            draw,
-            title_lines,
-            font_title,
-            y,
-            CANVAS_WIDTH,
-            theme["title_color"],
-            4 * SCALE,
-        )
-        y += 25 * SCALE
 
-        y = _draw_centered_lines(
+async def _run_in_render_pool(func: Callable[..., T], *args: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_render_executor(), func, *args)
+
+
+@driver.on_shutdown
+async def _shutdown_render_executor():
+    global _render_executor
+    if _render_executor is not None:
+        _render_executor.shutdown(wait=False, cancel_futures=True)
+        _render_executor = None
+
+
+@dataclass(frozen=True, slots=True)
+class TextLayout:
+    title_lines: list[str]
+    subtitle_lines: list[str]
+    body_lines: list[str]
+    copyright_text: str
+    date_text: str
+
+
+@dataclass(frozen=True, slots=True)
+class RenderResult:
+    image: bytes
+    # 翻译超时或缺少图片时为降级版本, 不应被缓存
+    degraded: bool = False
+
+
+def _load_fonts() -> tuple[FontLike, FontLike, FontLike, FontLike] | None:
+    fonts = tuple(_load_font(*spec) for spec in FONT_SPECS)
+    if any(font is None for font in fonts):
+        return None
+    return fonts  # type: ignore[return-value]
+
+
+def _layout_text(
+    subtitle_text: str,
+    explanation: str,
+    copyright_text: str,
+    date_text: str,
+) -> TextLayout | None:
+    fonts = _load_fonts()
+    if fonts is None:
+        return None
+    font_title, font_subtitle, font_body, _ = fonts
+    draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    return TextLayout(
+        _wrap_text(draw, "今日天文一图", font_title, CONTENT_WIDTH),
+        _wrap_text(
             draw,
-            subtitle_lines,
+            subtitle_text,
             font_subtitle,
-            y,
-            CANVAS_WIDTH,
-            theme["title_color"],
-            4 * SCALE,
-        )
-        y += 20 * SCALE
-
-        content_x = card_x + CARD_PADDING
-        if apod_img:
-            canvas.paste(apod_img, (content_x, y), apod_img)
-            y += img_height + SPACING
-
-        for line in body_lines:
-            draw.text(
-                (content_x, y),
-                line,
-                fill=theme["text_color"],
-                font=font_body,
-            )
-            y += body_lh + 6 * SCALE
-        y += 15 * SCALE
-
+            CONTENT_WIDTH,
+            keep_words=_is_latin_text(subtitle_text),
+        ),
+        _wrap_text(
+            draw,
+            explanation,
+            font_body,
+            CONTENT_WIDTH,
+            keep_words=_is_latin_text(explanation),
+        ),
+        copyright_text,
+        date_text,
+    )
+
+
+def _compose_image(
+    layout: TextLayout, apod_img: Image.Image | None, dark: bool
+) -> Image.Image:
+    fonts = _load_fonts()
+    assert fonts is not None
+    font_title, font_subtitle, font_body, font_info = fonts
+    theme = THEMES[dark]
+    title_lines = layout.title_lines
+    subtitle_lines = layout.subtitle_lines
+    body_lines = layout.body_lines
+
+    tmp = Image.new("RGB", (1, 1))
+    draw = ImageDraw.Draw(tmp)
+
+    title_lh = _line_height(draw, font_title)
+    subtitle_lh = _line_height(draw, font_subtitle)
+    body_lh = _line_height(draw, font_body)
+    info_lh = _line_height(draw, font_info)
+
+    img_height = 0
+    if apod_img:
+        img_height = apod_img.height
+        apod_img = _round_corners(apod_img, CORNER_RADIUS)
+
+    card_content_h = (
+        25 * SCALE
+        + len(title_lines) * (title_lh + 4 * SCALE)
+        + 25 * SCALE
+        + len(subtitle_lines) * (subtitle_lh + 4 * SCALE)
+        + 20 * SCALE
+        + (img_height + SPACING if apod_img else 0)
+        + len(body_lines) * (body_lh + 6 * SCALE)
+        + 15 * SCALE
+        + info_lh + 5 * SCALE
+        + info_lh
+    )
+    card_height = 2 * CARD_PADDING + card_content_h
+    canvas_height = 2 * PADDING + card_height
+
+    canvas = Image.new("RGBA", (CANVAS_WIDTH, canvas_height), theme["bg"])
+    draw = ImageDraw.Draw(canvas)
+
+    card_x = PADDING
+    card_y = PADDING
+    draw.rounded_rectangle(
+        [card_x, card_y, CANVAS_WIDTH - PADDING, card_y + card_height],
+        radius=CORNER_RADIUS,
+        fill=theme["card_bg"],
+    )
+
+    y = card_y + CARD_PADDING
+    y += 25 * SCALE
+    y = _draw_centered_lines(
+        draw,
+        title_lines,
+        font_title,
+        y,
+        CANVAS_WIDTH,
+        theme["title_color"],
+        4 * SCALE,
+    )
+    y += 25 * SCALE
+
+    y = _draw_centered_lines(
+        draw,
+        subtitle_lines,
+        font_subtitle,
+        y,
+        CANVAS_WIDTH,
+        theme["title_color"],
+        4 * SCALE,
+    )
+    y += 20 * SCALE
+
+    content_x = card_x + CARD_PADDING
+    if apod_img:
+        canvas.paste(apod_img, (content_x, y), apod_img)
+        y += img_height + SPACING
+
+    for line in body_lines:
         draw.text(
             (content_x, y),
-            copyright_text,
-            fill=theme["info_color"],
-            font=font_info,
+            line,
+            fill=theme["text_color"],
+            font=font_body,
         )
-        y += info_lh + 5 * SCALE
-        draw.text(
-            (content_x, y),
-            date_text,
-            fill=theme["info_color"],
-            font=font_info,
+        y += body_lh + 6 * SCALE
+    y += 15 * SCALE
+
+    draw.text(
+        (content_x, y),
+        layout.copyright_text,
+        fill=theme["info_color"],
+        font=font_info,
+    )
+    y += info_lh + 5 * SCALE
+    draw.text(
+        (content_x, y),
+        layout.date_text,
+        fill=theme["info_color"],
+        font=font_info,
+    )
+
+    return canvas.convert("RGB")
+
+
+def _compose_and_encode(
+    layout: TextLayout,
+    apod_img: Image.Image | None,
+    dark: bool,
+    output_format: str,
+    quality: int,
+    max_bytes: int,
+) -> tuple[bytes, float, float]:
+    start = time.perf_counter()
+    canvas = _compose_image(layout, apod_img, dark)
+    composed = time.perf_counter()
+    data = _encode_image(canvas, output_format, quality, max_bytes)
+    return data, composed - start, time.perf_counter() - composed
+
+
+def _save_image(image: Image.Image, output_format: str, quality: int) -> bytes:
+    buf = BytesIO()
+    if output_format == "jpeg":
+        image.save(buf, format="JPEG", quality=quality, progressive=True, optimize=True)
+    elif output_format == "webp":
+        image.save(buf, format="WEBP", quality=quality, method=4)
+    else:
+        image.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _encode_image(
+    image: Image.Image,
+    output_format: str,
+    quality: int,
+    max_bytes: int,
+) -> bytes:
+    data = _save_image(image, output_format, quality)
+    if output_format == "png" or max_bytes <= 0 or len(data) <= max_bytes:
+        return data
+    # 二分查找满足体积上限的最高质量, 均超出时返回最小的结果
+    low, high = MIN_QUALITY, quality - 1
+    best: bytes | None = None
+    smallest = data
+    while low <= high:
+        mid = (low + high) // 2
+        candidate = _save_image(image, output_format, mid)
+        if len(candidate) <= max_bytes:
+            best = candidate
+            low = mid + 1
+        else:
+            smallest = min(smallest, candidate, key=len)
+            high = mid - 1
+    return best or smallest
+
+
+async def _timed_stage(timings: dict[str, float], name: str, aw: Awaitable[T]) -> T:
+    start = time.perf_counter()
+    try:
+        return await aw
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+async def _await_stage(
+    task: asyncio.Task[T], timeout: float, fallback: T, name: str
+) -> T:
+    # 超时后降级渲染, 任务在后台继续完成(如翻译结果写入缓存), 供下次渲染使用
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"{name}超过 {timeout}s, 降级渲染")
+        return fallback
+
+
+def _render_key(date: str, translator: str | None) -> str:
+    return render_cache_key(
+        date,
+        dark_mode,
+        translator,
+        RENDER_VERSION,
+        output_format,
+        output_quality,
+        output_max_bytes,
+    )
+
+
+async def generate_apod_image() -> RenderResult | None:
+    global last_stage_timings
+    timings: dict[str, float] = {}
+    try:
+        data = await _timed_stage(timings, "metadata", ensure_apod_data())
+        if not data:
+            return None
+
+        # 译文均已缓存时可确定渲染缓存键, 命中则无需下载图片
+        translation = await get_cached_translation_text(data.explanation)
+        if translation and (
+            cached := await get_rendered_image(_render_key(data.date, translation[1]))
+        ):
+            logger.debug("命中天文一图渲染缓存")
+            return RenderResult(cached)
+
+        if _load_font(*TITLE_FONT) is None or _load_font(*BODY_FONT) is None:
+            logger.warning("缺少字体文件, 已降级为单图模式")
+            return None
+
+        # 翻译与图片下载、缩放互不依赖, 并行进行; 排版只等待翻译
+        download = asyncio.create_task(
+            _timed_stage(timings, "download", _download_image(data.url))
+        )
+        if translation is None:
+            translate = asyncio.create_task(
+                _timed_stage(
+                    timings, "translate", translate_with_backend(data.explanation)
+                )
+            )
+            translation = await _await_stage(
+                translate, translate_stage_timeout, (data.explanation, None), "翻译"
+            )
+        explanation, translator = translation
+        layout = await _timed_stage(
+            timings,
+            "layout",
+            _run_in_render_pool(
+                _layout_text,
+                data.title,
+                explanation,
+                f"版权：{data.copyright or '无'}",
+                f"日期：{data.date}",
+            ),
+        )
+        if layout is None:
+            download.cancel()
+            logger.warning("缺少字体文件, 已降级为单图模式")
+            return None
+        apod_img = await _await_stage(
+            download, download_stage_timeout, None, "图片下载"
         )
 
-        output = canvas.convert("RGB")
-        buf = BytesIO()
-        output.save(buf, format="PNG")
-        return buf.getvalue()
+        image, timings["compose"], timings["encode"] = await _run_in_render_pool(
+            _compose_and_encode,
+            layout,
+            apod_img,
+            dark_mode,
+            output_format,
+            output_quality,
+            output_max_bytes,
+        )
+        last_stage_timings = dict(timings)
+        logger.debug(
+            "天文一图渲染各阶段耗时: "
+            + ", ".join(f"{name} {cost:.2f}s" for name, cost in timings.items())
+        )
+        degraded = not apod_img or translator is None
+        # 翻译失败或图片缺失时不持久化, 以便下次重新渲染完整的版本
+        if not degraded:
+            await put_rendered_image(_render_key(data.date, translator), image)
+        return RenderResult(image, degraded)
     except Exception as e:
         logger.error(f"生成 NASA APOD 图片时发生错误：{e}")
         return None
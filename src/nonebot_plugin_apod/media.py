@@ -0,0 +1,92 @@
+import asyncio
+from typing import Any
+from collections.abc import Callable, Awaitable
+
+from nonebot.log import logger
+from nonebot.adapters import Bot
+from nonebot_plugin_alconna.uniseg import Image, Receipt
+
+
+# 按 (机器人, 图片摘要) 缓存平台侧的媒体句柄, None 表示该平台不支持复用
+_handles: dict[tuple[str, str], Image | None] = {}
+_locks: dict[tuple[str, str], asyncio.Lock] = {}
+
+
+async def _upload_kook(bot: Bot, raw: bytes) -> Image | None:
+    url = await bot.upload_file(raw)  # type: ignore[attr-defined]
+    return Image(url=url) if url else None
+
+
+def _telegram_handle(msg_id: Any) -> Image | None:
+    photos = getattr(msg_id, "photo", None)
+    if photos and (file_id := getattr(photos[-1], "file_id", None)):
+        return Image(id=file_id)
+    return None
+
+
+# 支持在发送前单独上传并返回可复用地址的平台
+UPLOADERS: dict[str, Callable[[Bot, bytes], Awaitable[Image | None]]] = {
+    "Kaiheila": _upload_kook,
+}
+# 支持从发送回执中取得可复用文件 ID 的平台
+RECEIPT_EXTRACTORS: dict[str, Callable[[Any], Image | None]] = {
+    "Telegram": _telegram_handle,
+}
+
+
+def _handle_from_receipt(bot: Bot, receipt: Receipt) -> Image | None:
+    extractor = RECEIPT_EXTRACTORS.get(bot.adapter.get_name())
+    if extractor is None or not receipt.msg_ids:
+        return None
+    try:
+        return extractor(receipt.msg_ids[0])
+    except Exception as e:
+        logger.debug(f"解析图片句柄失败: {e}")
+        return None
+
+
+async def send_image_once(
+    bot: Bot,
+    raw: bytes,
+    digest: str,
+    send: Callable[[Image], Awaitable[Receipt]],
+) -> Receipt:
+    key = (bot.self_id, digest)
+    if key not in _handles:
+        lock = _locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if key not in _handles:
+                return await _send_first(bot, raw, key, send)
+    handle = _handles[key]
+    if handle is not None:
+        try:
+            return await send(handle)
+        except Exception as e:
+            logger.warning(f"使用已上传的图片发送失败: {e}, 回退为直接发送图片")
+            _handles.pop(key, None)
+    return await send(Image(raw=raw))
+
+
+async def _send_first(
+    bot: Bot,
+    raw: bytes,
+    key: tuple[str, str],
+    send: Callable[[Image], Awaitable[Receipt]],
+) -> Receipt:
+    if uploader := UPLOADERS.get(bot.adapter.get_name()):
+        try:
+            handle = await uploader(bot, raw)
+        except Exception as e:
+            logger.warning(f"预先上传天文一图失败: {e}")
+        else:
+            if handle is not None:
+                _handles[key] = handle
+                return await send(handle)
+    receipt = await send(Image(raw=raw))
+    _handles[key] = _handle_from_receipt(bot, receipt)
+    return receipt
+
+
+def clear_image_handles():
+    _handles.clear()
+    _locks.clear()
@@ -0,0 +1,34 @@
+from typing import Any
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class ApodRecord:
+    date: str
+    title: str
+    explanation: str
+    media_type: str
+    url: str | None = None
+    hdurl: str | None = None
+    copyright: str | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ApodRecord":
+        return cls(
+            date=data.get("date", ""),
+            title=data.get("title", ""),
+            explanation=data.get("explanation", ""),
+            media_type=data.get("media_type", ""),
+            url=data.get("url"),
+            hdurl=data.get("hdurl"),
+            copyright=data.get("copyright"),
+        )
+
+    @property
+    def is_image(self) -> bool:
+        return self.media_type == "image" and bool(self.url)
+
+    def image_url(self, hd: bool = False) -> str | None:
+        if hd and self.hdurl:
+            return self.hdurl
+        return self.url
@@ -0,0 +1,45 @@
+import asyncio
+import hashlib
+
+from nonebot.log import logger
+import nonebot_plugin_localstore as store
+
+from .config import plugin_config
+from .diskcache import evict_lru, read_and_touch, atomic_write_bytes
+
+
+render_cache_dir = store.get_plugin_cache_dir() / "rendered"
+render_cache_max_bytes = plugin_config.apod_render_cache_max_mb * 1024 * 1024
+
+
+def render_cache_key(date: str, *parts: object) -> str:
+    digest = hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()
+    return f"{date}_{digest[:16]}"
+
+
+def _read(key: str) -> bytes | None:
+    return read_and_touch(render_cache_dir / f"{key}.img")
+
+
+def _write(key: str, data: bytes):
+    atomic_write_bytes(render_cache_dir / f"{key}.img", data)
+    evict_lru(render_cache_dir, "*.img", render_cache_max_bytes)
+
+
+async def get_rendered_image(key: str) -> bytes | None:
+    if render_cache_max_bytes <= 0:
+        return None
+    try:
+        return await asyncio.to_thread(_read, key)
+    except OSError as e:
+        logger.warning(f"读取渲染图片缓存失败: {e}")
+        return None
+
+
+async def put_rendered_image(key: str, data: bytes):
+    if render_cache_max_bytes <= 0 or len(data) > render_cache_max_bytes:
+        return
+    try:
+        await asyncio.to_thread(_write, key, data)
+    except OSError as e:
+        logger.warning(f"写入渲染图片缓存失败: {e}")
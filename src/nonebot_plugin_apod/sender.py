@@ -0,0 +1,109 @@
+import random
+import asyncio
+from typing import TypeVar
+from collections.abc import Callable, Awaitable
+
+from nonebot.log import logger
+from nonebot.exception import ActionFailed, ApiNotAvailable
+
+from .config import plugin_config
+
+
+T = TypeVar("T")
+send_rate = plugin_config.apod_send_rate
+send_burst = plugin_config.apod_send_burst
+send_bot_concurrency = plugin_config.apod_send_bot_concurrency
+send_retries = plugin_config.apod_send_retries
+send_retry_backoff = plugin_config.apod_send_retry_backoff
+# 平台的限流响应, 如 Telegram 的 error_code 或 Discord、QQ 的 HTTP 状态码
+RATE_LIMIT_CODES = frozenset({429})
+
+
+def _should_retry(e: Exception) -> bool:
+    # 只重试确定未送达的失败: 连接不可用时请求尚未发出, 限流时请求被平台拒绝;
+    # NetworkError 包含 API 调用超时(如 OneBot), 消息可能已经送达, 重试会重复发送;
+    # 其余 ActionFailed 多为权限不足、目标不存在等永久错误
+    if isinstance(e, ApiNotAvailable):
+        return True
+    if isinstance(e, ActionFailed):
+        codes = (getattr(e, "status_code", None), getattr(e, "error_code", None))
+        return any(code in RATE_LIMIT_CODES for code in codes)
+    return False
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated: float | None = None
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        if self._updated is not None:
+            elapsed = now - self._updated
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            self._refill(loop.time())
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill(loop.time())
+            self._tokens -= 1
+
+
+class BotSendQueue:
+    def __init__(
+        self,
+        bot_id: str,
+        rate: float,
+        burst: int,
+        concurrency: int,
+        retries: int,
+        backoff: float,
+    ):
+        self.bot_id = bot_id
+        self.bucket = TokenBucket(rate, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def submit(self, send: Callable[[], Awaitable[T]]) -> T:
+        async with self._semaphore:
+            attempt = 0
+            while True:
+                await self.bucket.acquire()
+                try:
+                    return await send()
+                except Exception as e:
+                    if attempt >= self.retries or not _should_retry(e):
+                        raise
+                    delay = self.backoff * 2**attempt * random.uniform(1, 1.5)
+                    attempt += 1
+                    logger.debug(
+                        f"机器人 {self.bot_id} 发送失败: {e!r}, "
+                        f"{delay:.1f}s 后进行第 {attempt} 次重试"
+                    )
+                    await asyncio.sleep(delay)
+
+
+_queues: dict[str, BotSendQueue] = {}
+
+
+def get_send_queue(bot_id: str) -> BotSendQueue:
+    queue = _queues.get(bot_id)
+    if queue is None:
+        queue = _queues[bot_id] = BotSendQueue(
+            bot_id,
+            rate=send_rate,
+            burst=send_burst,
+            concurrency=send_bot_concurrency,
+            retries=send_retries,
+            backoff=send_retry_backoff,
+        )
+    return queue
@@ -0,0 +1,102 @@
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from nonebot.log import logger
+from nonebot import get_driver
+import nonebot_plugin_localstore as store
+
+from .config import plugin_config
+
+
+translation_db_file = store.get_plugin_data_file("translations.db")
+memory_cache_size = plugin_config.apod_translation_cache_size
+
+_memory_cache: OrderedDict[str, str] = OrderedDict()
+_db: sqlite3.Connection | None = None
+_db_lock = threading.Lock()
+
+driver = get_driver()
+
+
+def translation_key(text: str, backend: str, target_lang: str, model: str = "") -> str:
+    digest = hashlib.sha256(text.encode()).hexdigest()
+    return f"{digest}:{backend}:{target_lang}:{model}"
+
+
+def _get_db() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(translation_db_file, check_same_thread=False)
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, created_at INTEGER NOT NULL)"
+        )
+        _db.commit()
+    return _db
+
+
+def _db_get(key: str) -> str | None:
+    with _db_lock:
+        row = (
+            _get_db()
+            .execute("SELECT text FROM translations WHERE key = ?", (key,))
+            .fetchone()
+        )
+    return row[0] if row else None
+
+
+def _db_put(key: str, text: str):
+    with _db_lock:
+        db = _get_db()
+        db.execute(
+            "INSERT OR REPLACE INTO translations (key, text, created_at) "
+            "VALUES (?, ?, ?)",
+            (key, text, int(time.time())),
+        )
+        db.commit()
+
+
+def _remember(key: str, text: str):
+    _memory_cache[key] = text
+    _memory_cache.move_to_end(key)
+    while len(_memory_cache) > memory_cache_size:
+        _memory_cache.popitem(last=False)
+
+
+async def get_cached_translation(key: str) -> str | None:
+    if (text := _memory_cache.get(key)) is not None:
+        _memory_cache.move_to_end(key)
+        return text
+    try:
+        text = await asyncio.to_thread(_db_get, key)
+    except sqlite3.Error as e:
+        logger.warning(f"读取翻译缓存失败: {e}")
+        return None
+    if text is not None:
+        _remember(key, text)
+    return text
+
+
+async def put_cached_translation(key: str, text: str):
+    _remember(key, text)
+    try:
+        await asyncio.to_thread(_db_put, key, text)
+    except sqlite3.Error as e:
+        logger.warning(f"写入翻译缓存失败: {e}")
+
+
+def close_translation_db():
+    global _db
+    with _db_lock:
+        if _db is not None:
+            _db.close()
+            _db = None
+
+
+@driver.on_shutdown
+async def _close_translation_db():
+    close_translation_db()
@@ -0,0 +1,174 @@
+import time
+from typing import Any, TypeVar
+from functools import partial
+from collections.abc import Callable, Awaitable
+
+import httpx
+from nonebot.log import logger
+
+from .config import plugin_config
+from .hedge import LatencyTracker, hedged
+
+
+T = TypeVar("T")
+EWMA_ALPHA = 0.2
+# 错误率折算为等效延迟(秒)参与排序
+ERROR_PENALTY = 10.0
+failure_threshold = plugin_config.apod_upstream_failure_threshold
+breaker_cooldown = plugin_config.apod_upstream_cooldown
+hedge_enabled = plugin_config.apod_hedge_requests
+hedge_percentile = plugin_config.apod_hedge_percentile
+hedge_delay = plugin_config.apod_hedge_delay
+# 仅这些状态码表示请求本身有误(如日期尚未发布), 与上游是否健康无关;
+# 401/403/429 等说明该上游的密钥或配额有问题, 按上游故障处理并继续尝试其他上游
+REQUEST_ERROR_STATUSES = frozenset({400, 404})
+
+
+def is_request_error(e: httpx.HTTPStatusError) -> bool:
+    return e.response.status_code in REQUEST_ERROR_STATUSES
+
+
+class HealthStats:
+    def __init__(self):
+        self.latency: float | None = None
+        self.error_rate = 0.0
+
+    def score(self, prior: float = 0.0) -> float:
+        latency = self.latency if self.latency is not None else prior
+        return latency + self.error_rate * ERROR_PENALTY
+
+    def record_success(self, latency: float):
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += EWMA_ALPHA * (latency - self.latency)
+        self.error_rate *= 1 - EWMA_ALPHA
+
+    def record_failure(self):
+        self.error_rate += EWMA_ALPHA * (1 - self.error_rate)
+
+
+def rank_by_health(items: list[T], stats: Callable[[T], HealthStats]) -> list[T]:
+    latencies = [s.latency for s in map(stats, items) if s.latency is not None]
+    # 尚无样本的一方以已知延迟的均值作为先验, 同分时保持配置顺序
+    prior = sum(latencies) / len(latencies) if latencies else 0.0
+    return sorted(items, key=lambda item: stats(item).score(prior))
+
+
+class Endpoint(HealthStats):
+    def __init__(
+        self,
+        url: str,
+        api_key: str | None = None,
+        *,
+        mirror: bool = True,
+        supports_ranges: bool = False,
+    ):
+        super().__init__()
+        self.url = url
+        self.api_key = api_key
+        self.mirror = mirror
+        # 是否支持 count、start_date 等返回列表的区间参数
+        self.supports_ranges = supports_ranges
+        self.name = httpx.URL(url).host or url
+        self.failures = 0
+        self.open_until = 0.0
+        self.latencies = LatencyTracker()
+
+    def request_options(
+        self, params: dict[str, Any] | None = None
+    ) -> tuple[dict[str, str], dict[str, Any]]:
+        params = dict(params or {})
+        if not self.mirror:
+            return {}, {"api_key": self.api_key, **params}
+        if self.api_key:
+            return {"Authorization": f"Bearer {self.api_key}"}, params
+        return {}, params
+
+    @property
+    def is_open(self) -> bool:
+        return time.monotonic() < self.open_until
+
+    def record_success(self, latency: float):
+        super().record_success(latency)
+        self.failures = 0
+        self.open_until = 0.0
+        self.latencies.record(latency)
+
+    def record_failure(self):
+        super().record_failure()
+        self.failures += 1
+        if self.failures >= failure_threshold:
+            self.open_until = time.monotonic() + breaker_cooldown
+            logger.warning(
+                f"上游 {self.name} 连续失败 {self.failures} 次, "
+                f"熔断 {breaker_cooldown}s"
+            )
+
+
+class UpstreamPool:
+    def __init__(self, endpoints: list[Endpoint]):
+        self.endpoints = endpoints
+
+    def ranked(self) -> list[Endpoint]:
+        closed = [e for e in self.endpoints if not e.is_open]
+        if closed:
+            return rank_by_health(closed, lambda e: e)
+        # 全部熔断时按恢复时间依次尝试, 不让请求直接失败
+        return sorted(self.endpoints, key=lambda e: e.open_until)
+
+    async def _call(
+        self, endpoint: Endpoint, request: Callable[[Endpoint], Awaitable[T | None]]
+    ) -> T | None:
+        start = time.perf_counter()
+        try:
+            result = await request(endpoint)
+        except httpx.HTTPStatusError as e:
+            if is_request_error(e):
+                raise
+            logger.error(f"上游 {endpoint.name} 返回错误: {e}")
+            result = None
+        except Exception as e:
+            logger.error(f"请求上游 {endpoint.name} 时发生错误: {e!r}")
+            result = None
+        if result is None:
+            endpoint.record_failure()
+        else:
+            endpoint.record_success(time.perf_counter() - start)
+        return result
+
+    async def request(
+        self,
+        request: Callable[[Endpoint], Awaitable[T | None]],
+        *,
+        ranges: bool = False,
+        hedge: bool = True,
+    ) -> T | None:
+        request_errors: list[httpx.HTTPStatusError] = []
+
+        async def call(endpoint: Endpoint) -> T | None:
+            try:
+                return await self._call(endpoint, request)
+            except httpx.HTTPStatusError as e:
+                request_errors.append(e)
+                return None
+
+        ranked = self.ranked()
+        if ranges:
+            ranked = [e for e in ranked if e.supports_ranges]
+        result = None
+        if hedge and hedge_enabled and len(ranked) >= 2:
+            primary, secondary = ranked[0], ranked[1]
+            delay = primary.latencies.percentile(hedge_percentile) or hedge_delay
+            result = await hedged(
+                partial(call, primary), partial(call, secondary), delay
+            )
+            ranked = ranked[2:]
+        for endpoint in ranked:
+            if result is not None or request_errors:
+                break
+            logger.debug(f"尝试通过 {endpoint.name} 获取天文一图数据")
+            result = await call(endpoint)
+        if result is None and request_errors:
+            raise request_errors[0]
+        return result
@@ -2,17 +2,34 @@ import re
 import json
 import random
 import hashlib
+import time
 import asyncio
 import contextlib
-from datetime import datetime
+from typing import Any
+from datetime import date, datetime, timedelta
+from collections import OrderedDict, deque
+from functools import partial
+from collections.abc import Callable, Awaitable
 
 import httpx
-import aiofiles
 from nonebot.log import logger
 from nonebot import get_driver
 import nonebot_plugin_localstore as store
 
+from .models import ApodRecord
+from .hedge import race
+from .upstream import (
+    Endpoint,
+    HealthStats,
+    UpstreamPool,
+    rank_by_health,
+    is_request_error,
+)
+from .archive import get_archived_apod, count_archived_apod, archive_apod_records
 from .config import plugin_config
+from .diskcache import atomic_write_bytes
+from .http_cache import ResponseTooLarge, conditional_get
+from .trans_cache import translation_key, get_cached_translation, put_cached_translation
 
 nasa_api_key = plugin_config.apod_api_key
 baidu_trans = plugin_config.apod_baidu_trans
@@ -28,10 +45,28 @@ BAIDU_API_URL = "http://api.fanyi.baidu.com/api/trans/vip/translate"
 QWEN_MT_API_URL = plugin_config.apod_qwen_mt_api_url
 qwen_mt_model_name = plugin_config.apod_qwen_mt_model_name
 qwen_mt_api_key = plugin_config.apod_qwen_mt_api_key
+qwen_mt_stream = plugin_config.apod_qwen_mt_stream
+qwen_mt_incremental_output = plugin_config.apod_qwen_mt_incremental_output
 apod_cache_json = store.get_plugin_cache_file("apod.json")
 task_config_file = store.get_plugin_data_file("apod_task_config.json")
 mirror_url = plugin_config.apod_mirror_url
 mirror_api_key = plugin_config.apod_mirror_api_key
+fetch_failure_ttl = plugin_config.apod_fetch_failure_ttl
+mirrors = plugin_config.apod_mirrors
+backfill_chunk_days = plugin_config.apod_backfill_chunk_days
+backfill_interval = plugin_config.apod_backfill_interval
+random_pool_size = plugin_config.apod_random_pool_size
+random_pool_low_water = plugin_config.apod_random_pool_low_water
+prefetch_images = plugin_config.apod_prefetch_images
+prefetch_image_max_bytes = plugin_config.apod_prefetch_image_max_mb * 1024 * 1024
+backfill_translate = plugin_config.apod_backfill_translate
+translator_order = plugin_config.apod_translator_order
+translate_timeout = plugin_config.apod_translate_timeout
+translate_race = plugin_config.apod_translate_race
+translate_backend_timeout = plugin_config.apod_translate_backend_timeout
+translate_segment_chars = plugin_config.apod_translate_segment_chars
+translate_concurrency = plugin_config.apod_translate_concurrency
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
 
 
 _httpx_client: httpx.AsyncClient | None = None
@@ -79,21 +114,75 @@ def is_valid_date_format(date_str: str) -> bool:
     return d >= datetime(1995, 6, 16) and d <= datetime.now()
 
 
-async def ensure_apod_data() -> bool:
+# 按日期缓存已解析的天文一图数据, 磁盘上的 apod.json 仅用于重启后恢复
+_apod_records: dict[str, ApodRecord] = {}
+MAX_APOD_RECORDS = 7
+
+
+def _remember_apod_data(data: dict) -> ApodRecord:
+    record = ApodRecord.from_dict(data)
+    _apod_records.pop(record.date, None)
+    _apod_records[record.date] = record
+    while len(_apod_records) > MAX_APOD_RECORDS:
+        _apod_records.pop(next(iter(_apod_records)))
+    return record
+
+
+def _latest_apod_record() -> ApodRecord | None:
+    return next(reversed(_apod_records.values()), None)
+
+
+def clear_apod_records():
+    _apod_records.clear()
+
+
+async def ensure_apod_data() -> ApodRecord | None:
+    today = datetime.now().strftime("%Y-%m-%d")
+    if record := _apod_records.get(today):
+        return record
     if apod_cache_json.exists():
         try:
-            content = apod_cache_json.read_text(encoding="utf-8")
+            content = await asyncio.to_thread(
+                apod_cache_json.read_text, encoding="utf-8"
+            )
             data = json.loads(content)
             cached_date = data.get("date", "")
-            today = datetime.now().strftime("%Y-%m-%d")
             if cached_date == today:
-                return True
+                return _remember_apod_data(data)
             logger.debug(f"天文一图数据缓存过期（{cached_date}）,将重新获取")
         except (json.JSONDecodeError, KeyError, OSError) as e:
             logger.warning(f"读取天文一图数据缓存失败: {e}, 将重新获取")
         with contextlib.suppress(OSError):
             apod_cache_json.unlink()
-    return await fetch_data()
+    if not await fetch_data_once():
+        return None
+    return _apod_records.get(today) or _latest_apod_record()
+
+
+_fetch_tasks: dict[str, asyncio.Task[bool]] = {}
+_fetch_failures: dict[str, float] = {}
+
+
+def _on_fetch_done(date: str, task: asyncio.Task[bool]):
+    _fetch_tasks.pop(date, None)
+    if task.cancelled() or task.exception() is not None or not task.result():
+        _fetch_failures[date] = time.monotonic()
+    else:
+        _fetch_failures.pop(date, None)
+
+
+async def fetch_data_once() -> bool:
+    today = datetime.now().strftime("%Y-%m-%d")
+    failed_at = _fetch_failures.get(today)
+    if failed_at is not None and time.monotonic() - failed_at < fetch_failure_ttl:
+        logger.debug("天文一图数据获取近期失败, 暂不重试")
+        return False
+    task = _fetch_tasks.get(today)
+    if task is None:
+        task = asyncio.create_task(fetch_data())
+        task.add_done_callback(partial(_on_fetch_done, today))
+        _fetch_tasks[today] = task
+    return await asyncio.shield(task)
 
 
 if baidu_trans and (not baidu_trans_api_key or not baidu_trans_appid):
@@ -113,6 +202,32 @@ if qwen_trans and not qwen_mt_api_key:
     qwen_trans = False
 
 
+async def _qwen_stream(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: dict[str, str],
+    payload: dict,
+    incremental: bool,
+) -> str:
+    content = ""
+    # 增量输出时逐片拼接, 否则(Qwen-MT 默认)每片为截至当前的完整译文
+    payload = {**payload, "stream": True, "incremental_output": incremental}
+    async with client.stream("POST", url, headers=headers, json=payload) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            chunk = line[5:].strip()
+            if chunk == "[DONE]":
+                break
+            choices = json.loads(chunk).get("choices") or []
+            delta = choices[0].get("delta", {}).get("content") if choices else None
+            if not delta:
+                continue
+            content = content + delta if incremental else delta
+    return content
+
+
 async def qwen_translate_text(
     text: str,
     target_lang: str = "Chinese",
@@ -148,6 +263,10 @@ async def qwen_translate_text(
         url = api_url.rstrip("/")
         if not url.endswith("/chat/completions"):
             url += "/chat/completions"
+        if qwen_mt_stream:
+            return await _qwen_stream(
+                client, url, headers, payload, qwen_mt_incremental_output
+            )
         resp = await client.post(url=url, headers=headers, json=payload)
         resp.raise_for_status()
         data = resp.json()
@@ -157,14 +276,15 @@ async def qwen_translate_text(
         raise
 
 
-async def baidu_translate_text(
-    query,
+async def baidu_translate_lines(
+    lines: list[str],
     from_lang="auto",
     to_lang="zh",
     appid=baidu_trans_appid,
     api_key=baidu_trans_api_key,
-) -> str:
+) -> list[str]:
     try:
+        query = "\n".join(lines)
         salt = random.randint(32768, 65536)
         sign = hashlib.md5(f"{appid}{query}{salt}{api_key}".encode()).hexdigest()
         payload = {
@@ -181,7 +301,7 @@ async def baidu_translate_text(
         result_all = response.text
         result = json.loads(result_all)
         if "trans_result" in result:
-            return "\n".join([item["dst"] for item in result["trans_result"]])
+            return [item["dst"] for item in result["trans_result"]]
         else:
             error_msg = result.get("error_msg", "未知错误")
             logger.error(f"百度翻译 API 返回错误: {error_msg}")
@@ -191,11 +311,23 @@ async def baidu_translate_text(
         raise
 
 
-async def deepl_translate_text(
-    text: str,
+async def baidu_translate_text(query: str) -> str:
+    return "\n".join(await baidu_translate_lines([query]))
+
+
+async def baidu_translate_batch(texts: list[str]) -> list[str]:
+    # 百度按行返回译文, 空行不会出现在结果中
+    results = await baidu_translate_lines(texts)
+    if len(results) != len(texts):
+        raise RuntimeError("百度翻译返回的行数与请求不一致")
+    return results
+
+
+async def deepl_translate_batch(
+    texts: list[str],
     target_lang: str = "ZH",
     api_key=deepl_trans_api_key,
-) -> str:
+) -> list[str]:
     try:
         client = get_httpx_client()
         response = await client.post(
@@ -205,131 +337,480 @@ async def deepl_translate_text(
                 "Content-Type": "application/json",
             },
             json={
-                "text": [text],
+                "text": texts,
                 "target_lang": target_lang,
             },
         )
         response.raise_for_status()
         result = response.json()
-        return result["translations"][0]["text"]
+        return [item["text"] for item in result["translations"]]
     except Exception as e:
         logger.error(f"DeepL 翻译时发生错误：{e}")
         raise
 
 
-async def translate_text_auto(text: str, timeout: int = 8) -> str:
-    translate_func = (
-        qwen_translate_text
-        if qwen_trans
-        else deepl_translate_text
-        if deepl_trans
-        else baidu_translate_text
-        if baidu_trans
-        else None
-    )
-    if not translate_func:
-        return text
+async def deepl_translate_text(text: str) -> str:
+    return (await deepl_translate_batch([text]))[0]
+
+
+Translator = tuple[str, Callable[[str], Awaitable[str]], str, str]
+# 各翻译服务的平均耗时与错误率, 用于决定尝试顺序
+_translator_stats: dict[str, HealthStats] = {}
+
+
+def _get_translators() -> list[Translator]:
+    enabled: dict[str, Translator] = {}
+    if qwen_trans:
+        enabled["qwen"] = ("qwen", qwen_translate_text, "Chinese", qwen_mt_model_name)
+    if deepl_trans:
+        enabled["deepl"] = ("deepl", deepl_translate_text, "ZH", "")
+    if baidu_trans:
+        enabled["baidu"] = ("baidu", baidu_translate_text, "zh", "")
+    order = [name for name in translator_order if name in enabled]
+    order += [name for name in enabled if name not in order]
+    return [enabled[name] for name in order]
+
+
+def _translator_label(translator: Translator) -> str:
+    name, _, _, model = translator
+    return f"{name}:{model}" if model else name
+
+
+def _translator_health(name: str) -> HealthStats:
+    return _translator_stats.setdefault(name, HealthStats())
+
+
+def _split_segments(text: str) -> list[list[str]]:
+    # 按段落切分, 过长的段落再按句子合并为不超过上限的片段
+    paragraphs = []
+    for paragraph in text.split("\n"):
+        chunks: list[str] = []
+        for sentence in SENTENCE_BOUNDARY.split(paragraph.strip()):
+            if chunks and len(chunks[-1]) + len(sentence) < translate_segment_chars:
+                chunks[-1] = f"{chunks[-1]} {sentence}"
+            elif sentence:
+                chunks.append(sentence)
+        paragraphs.append(chunks)
+    return paragraphs
+
+
+def _batched(segments: list[str], max_items: int, max_chars: int) -> list[list[str]]:
+    batches: list[list[str]] = []
+    size = 0
+    for segment in segments:
+        if (
+            not batches
+            or len(batches[-1]) >= max_items
+            or size + len(segment) > max_chars
+        ):
+            batches.append([])
+            size = 0
+        batches[-1].append(segment)
+        size += len(segment)
+    return batches
+
+
+async def _translate_segments(translator: Translator, segments: list[str]) -> list[str]:
+    name, translate_func, _, _ = translator
+    if len(segments) == 1:
+        return [await translate_func(segments[0])]
+    if name == "deepl":
+        batches = _batched(segments, 50, 30000)
+        batch_func = deepl_translate_batch
+    elif name == "baidu":
+        batches = _batched(segments, 100, 2000)
+        batch_func = baidu_translate_batch
+    else:
+        batches = [[segment] for segment in segments]
+        batch_func = None
+    semaphore = asyncio.Semaphore(max(translate_concurrency, 1))
+
+    async def run(batch: list[str]) -> list[str]:
+        async with semaphore:
+            if batch_func is None:
+                return [await translate_func(batch[0])]
+            return await batch_func(batch)
+
+    results = await asyncio.gather(*(run(batch) for batch in batches))
+    translated = [text for batch in results for text in batch]
+    if len(translated) != len(segments):
+        raise RuntimeError("译文片段数量与原文不一致")
+    return translated
+
+
+async def _try_translator(
+    translator: Translator, segments: list[str], deadline: float, last: bool
+) -> tuple[str, dict[str, str]] | None:
+    name, _, target_lang, model = translator
+    remaining = deadline - asyncio.get_running_loop().time()
+    if remaining <= 0:
+        return None
+    timeout = remaining if last else min(remaining, translate_backend_timeout)
+    stats = _translator_health(name)
+    start = time.perf_counter()
     try:
-        return await asyncio.wait_for(translate_func(text), timeout=timeout)
+        results = await asyncio.wait_for(
+            _translate_segments(translator, segments), timeout=timeout
+        )
     except asyncio.TimeoutError:
-        logger.warning(f"翻译超时（>{timeout}s），将返回原文")
+        stats.record_failure()
+        logger.warning(f"{name} 翻译超时（>{timeout:.1f}s）")
+        return None
     except Exception as e:
-        logger.error(f"翻译服务发生错误：{e}，将返回原文")
-    return text
+        stats.record_failure()
+        logger.error(f"{name} 翻译服务发生错误：{e}")
+        return None
+    stats.record_success(time.perf_counter() - start)
+    translated = dict(zip(segments, results, strict=True))
+    for segment, result in translated.items():
+        cache_key = translation_key(segment, name, target_lang, model)
+        await put_cached_translation(cache_key, result)
+    return _translator_label(translator), translated
+
+
+async def _cached_segment(
+    segment: str, translators: list[Translator]
+) -> tuple[str, str] | None:
+    for translator in translators:
+        name, _, target_lang, model = translator
+        cache_key = translation_key(segment, name, target_lang, model)
+        if (cached := await get_cached_translation(cache_key)) is not None:
+            return cached, _translator_label(translator)
+    return None
+
+
+async def _lookup_segments(
+    text: str, translators: list[Translator]
+) -> tuple[list[list[str]], list[str], dict[str, tuple[str, str]]]:
+    paragraphs = _split_segments(text)
+    segments = list(dict.fromkeys(s for chunks in paragraphs for s in chunks))
+    translated: dict[str, tuple[str, str]] = {}
+    for segment in segments:
+        if (cached := await _cached_segment(segment, translators)) is not None:
+            translated[segment] = cached
+    return paragraphs, segments, translated
+
+
+def _join_segments(
+    paragraphs: list[list[str]], translated: dict[str, tuple[str, str]]
+) -> tuple[str, str]:
+    text = "\n".join(
+        "".join(translated[chunk][0] for chunk in chunks) for chunks in paragraphs
+    )
+    # 各段可能来自不同的翻译服务, 全部列出以区分译文版本
+    backends = sorted({label for _, label in translated.values()})
+    return text, "+".join(backends) or "none"
 
 
-async def fetch_apod_data() -> bool:
-    try:
-        client = get_httpx_client()
-        response = await client.get(NASA_API_URL, params={"api_key": nasa_api_key})
-        response.raise_for_status()
-        data = response.json()
-        async with aiofiles.open(apod_cache_json, "w", encoding="utf-8") as f:
-            await f.write(json.dumps(data, indent=4))
-        return True
-    except (httpx.RequestError, httpx.HTTPStatusError) as e:
-        logger.error(f"获取 NASA 每日天文一图数据时发生错误: {e}")
-        return False
+async def get_cached_translation_text(text: str) -> tuple[str, str] | None:
+    translators = _get_translators()
+    if not translators:
+        return text, "none"
+    paragraphs, segments, translated = await _lookup_segments(text, translators)
+    if len(translated) < len(segments):
+        return None
+    return _join_segments(paragraphs, translated)
+
+
+async def translate_with_backend(
+    text: str, timeout: float | None = None
+) -> tuple[str, str | None]:
+    # 返回译文及实际完成翻译的服务, 未启用翻译时为 "none", 翻译失败时为 None
+    translators = _get_translators()
+    if not translators:
+        return text, "none"
+    if timeout is None:
+        timeout = translate_timeout
+    paragraphs, segments, translated = await _lookup_segments(text, translators)
+    missing = [segment for segment in segments if segment not in translated]
+    if translated:
+        logger.debug(f"翻译缓存命中 {len(translated)}/{len(segments)} 段")
+    if missing:
+        result = await _translate_missing(translators, missing, timeout)
+        if result is None:
+            logger.warning("所有翻译服务均未成功，将返回原文")
+            return text, None
+        label, results = result
+        translated.update((segment, (r, label)) for segment, r in results.items())
+    return _join_segments(paragraphs, translated)
+
+
+async def translate_text_auto(text: str, timeout: float | None = None) -> str:
+    return (await translate_with_backend(text, timeout))[0]
+
+
+async def _translate_missing(
+    translators: list[Translator], segments: list[str], timeout: float
+) -> tuple[str, dict[str, str]] | None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    ranked = rank_by_health(translators, lambda t: _translator_health(t[0]))
+    if translate_race > 1 and len(ranked) > 1:
+        head, ranked = ranked[:translate_race], ranked[translate_race:]
+        result = await race(
+            [partial(_try_translator, t, segments, deadline, not ranked) for t in head]
+        )
+        if result is not None:
+            return result
+    for index, translator in enumerate(ranked):
+        last = index == len(ranked) - 1
+        if result := await _try_translator(translator, segments, deadline, last):
+            return result
+    return None
+
+
+async def _save_apod_data(data: dict):
+    _remember_apod_data(data)
+    # 原子替换, 避免并发批次读到写了一半的缓存文件
+    await asyncio.to_thread(
+        atomic_write_bytes, apod_cache_json, json.dumps(data, indent=4).encode()
+    )
 
 
-async def fetch_apod_data_by_date(date: str) -> dict | None:
+def _first_record(data: Any) -> dict | None:
+    if isinstance(data, dict):
+        return data
+    if isinstance(data, list) and len(data) > 0:
+        return data[0]
+    return None
+
+
+async def _request_json(
+    endpoint: Endpoint,
+    params: dict[str, Any] | None = None,
+    *,
+    conditional: bool = False,
+) -> Any | None:
+    headers, query = endpoint.request_options(params)
     try:
         client = get_httpx_client()
-        response = await client.get(
-            NASA_API_URL,
-            params={"api_key": nasa_api_key, "date": date},
-        )
+        if conditional:
+            response = await conditional_get(
+                client, endpoint.url, params=query or None, headers=headers
+            )
+        else:
+            response = await client.get(endpoint.url, params=query, headers=headers)
         response.raise_for_status()
-        data = response.json()
-        if isinstance(data, dict):
-            return data
-        if isinstance(data, list) and len(data) > 0:
-            return data[0]
+        return response.json()
+    except httpx.HTTPStatusError as e:
+        if is_request_error(e):
+            raise
+        logger.error(f"通过 {endpoint.name} 获取天文一图数据时发生错误: {e}")
         return None
-    except (httpx.RequestError, httpx.HTTPStatusError) as e:
-        logger.error(f"获取 NASA 指定日期天文一图数据时发生错误: {e}")
+    except (httpx.RequestError, ValueError) as e:
+        logger.error(f"通过 {endpoint.name} 获取天文一图数据时发生错误: {e}")
         return None
 
 
-async def fetch_randomly_apod_data() -> dict | None:
-    try:
-        client = get_httpx_client()
-        response = await client.get(
-            NASA_API_URL,
-            params={"api_key": nasa_api_key, "count": 1},
-        )
-        response.raise_for_status()
-        data = response.json()
-        if isinstance(data, list) and len(data) > 0:
-            return data[0]
-        if isinstance(data, dict):
-            return data
+async def _request_records(
+    endpoint: Endpoint, params: dict[str, Any]
+) -> list[dict] | None:
+    data = await _request_json(endpoint, params)
+    if not isinstance(data, list):
+        if data is not None:
+            logger.warning(f"{endpoint.name} 未按区间参数返回列表, 已忽略该响应")
         return None
-    except (httpx.RequestError, httpx.HTTPStatusError) as e:
-        logger.error(f"获取 NASA 随机天文一图数据时发生错误: {e}")
+    return [record for record in data if isinstance(record, dict)]
+
+
+async def _request_endpoint(
+    endpoint: Endpoint,
+    params: dict[str, Any] | None = None,
+    *,
+    conditional: bool = False,
+) -> dict | None:
+    data = await _request_json(endpoint, params, conditional=conditional)
+    return _first_record(data)
+
+
+def _nasa_endpoint() -> Endpoint:
+    return Endpoint(NASA_API_URL, nasa_api_key, mirror=False, supports_ranges=True)
+
+
+_upstream_pool: UpstreamPool | None = None
+
+
+def get_upstream_pool() -> UpstreamPool:
+    global _upstream_pool
+    if _upstream_pool is None:
+        endpoints = [
+            Endpoint(m.url, m.api_key, supports_ranges=m.supports_ranges)
+            for m in mirrors
+        ]
+        if mirror_url:
+            endpoints.insert(0, Endpoint(mirror_url, mirror_api_key))
+        endpoints.append(_nasa_endpoint())
+        _upstream_pool = UpstreamPool(endpoints)
+    return _upstream_pool
+
+
+async def _request_upstream(
+    request: Callable[[Endpoint], Awaitable[Any | None]],
+    *,
+    ranges: bool = False,
+    hedge: bool = True,
+) -> Any | None:
+    try:
+        return await get_upstream_pool().request(request, ranges=ranges, hedge=hedge)
+    except httpx.HTTPStatusError as e:
+        logger.warning(f"天文一图数据请求被上游拒绝: {e}")
         return None
 
 
-async def fetch_apod_data_from_mirror(url: str, api_key: str) -> bool:
+async def fetch_apod_data() -> bool:
     try:
-        client = get_httpx_client()
-        headers = {"Authorization": f"Bearer {api_key}"}
-        response = await client.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        async with aiofiles.open(apod_cache_json, "w", encoding="utf-8") as f:
-            await f.write(json.dumps(data, indent=4))
-        logger.debug("成功通过镜像获取天文一图数据")
-        return True
-    except (httpx.RequestError, httpx.HTTPStatusError) as e:
-        logger.error(f"通过镜像获取天文一图数据时发生错误: {e}")
+        data = await _request_endpoint(_nasa_endpoint(), conditional=True)
+    except httpx.HTTPStatusError as e:
+        logger.warning(f"天文一图数据请求被上游拒绝: {e}")
+        return False
+    if data is None:
         return False
+    await _save_apod_data(data)
+    return True
 
 
-async def fetch_apod_data_by_date_from_mirror(
-    url: str, api_key: str, date: str
-) -> dict | None:
+async def fetch_data() -> bool:
+    data = await _request_upstream(partial(_request_endpoint, conditional=True))
+    if data is None:
+        return False
+    await _save_apod_data(data)
+    return True
+
+
+async def fetch_apod_data_by_date(date: str) -> dict | None:
+    if data := await get_archived_apod(date):
+        return data
+    data = await _request_upstream(partial(_request_endpoint, params={"date": date}))
+    # 当日数据可能仍会被修订, 仅归档历史日期
+    if data and data.get("date") == date and date < datetime.now().strftime("%Y-%m-%d"):
+        await archive_apod_records([data])
+    return data
+
+
+# 后台预先翻译简介并可选地预下载图片, 命令处理时直接命中本地结果
+# 仅为仍在随机池中的记录保留图片, 数量不超过随机池容量
+_prefetched_images: OrderedDict[str, bytes] = OrderedDict()
+_enrich_tasks: set[asyncio.Task[None]] = set()
+_enrich_semaphore = asyncio.Semaphore(2)
+
+
+async def _prefetch_image(url: str) -> bytes | None:
     try:
-        client = get_httpx_client()
-        headers = {"Authorization": f"Bearer {api_key}"}
-        response = await client.get(
-            url,
-            headers=headers,
-            params={"date": date},
+        response = await conditional_get(
+            get_httpx_client(), url, timeout=20, max_bytes=prefetch_image_max_bytes
         )
         response.raise_for_status()
-        data = response.json()
-        return data
+        return response.content
+    except ResponseTooLarge as e:
+        logger.debug(f"天文图片过大, 不进行预下载: {e}")
+        return None
     except (httpx.RequestError, httpx.HTTPStatusError) as e:
-        logger.error(f"通过镜像获取指定日期天文一图数据时发生错误: {e}")
+        logger.warning(f"预下载天文图片失败: {e}")
         return None
 
 
-async def fetch_data() -> bool:
-    if mirror_url and mirror_api_key:
-        ok = await fetch_apod_data_from_mirror(mirror_url, mirror_api_key)
-        if ok:
-            return True
-        logger.warning("镜像获取失败, 回退到 NASA API")
-    ok = await fetch_apod_data()
-    return ok
+async def enrich_apod_record(data: dict, prefetch_image: bool = False):
+    async with _enrich_semaphore:
+        if explanation := data.get("explanation"):
+            await translate_text_auto(explanation)
+        url = data.get("url")
+        if not prefetch_image or not url or url in _prefetched_images:
+            return
+        image = await _prefetch_image(url)
+        # 下载期间记录可能已被取走, 此时图片不会再被使用
+        if not image or all(r.get("url") != url for r in _random_pool):
+            return
+        _prefetched_images[url] = image
+        while len(_prefetched_images) > max(random_pool_size, 1):
+            _prefetched_images.popitem(last=False)
+
+
+def _enrich_in_background(records: list[dict], prefetch_image: bool = False):
+    for record in records:
+        task = asyncio.create_task(enrich_apod_record(record, prefetch_image))
+        _enrich_tasks.add(task)
+        task.add_done_callback(_enrich_tasks.discard)
+
+
+def pop_prefetched_image(url: str) -> bytes | None:
+    return _prefetched_images.pop(url, None)
+
+
+def clear_prefetched_images():
+    _prefetched_images.clear()
+
+
+# 预取的随机天文一图(仅图片), 低于低水位时在后台补充
+_random_pool: deque[dict] = deque()
+_random_refill_task: asyncio.Task[None] | None = None
+
+
+async def _refill_random_pool():
+    # 不支持 count 参数的镜像会返回当日数据, 随机请求只发往支持区间参数的上游;
+    # 列表请求耗时与单条请求不可比, 且在后台进行, 不做对冲以免重复消耗配额
+    records = await _request_upstream(
+        partial(_request_records, params={"count": max(random_pool_size, 1)}),
+        ranges=True,
+        hedge=False,
+    )
+    if records is None:
+        return
+    today = datetime.now().strftime("%Y-%m-%d")
+    await archive_apod_records([r for r in records if r.get("date", today) < today])
+    pooled = {r.get("date") for r in _random_pool}
+    added = []
+    for record in records:
+        is_image = record.get("media_type") == "image" and record.get("url")
+        if is_image and record.get("date") not in pooled:
+            pooled.add(record.get("date"))
+            added.append(record)
+    _random_pool.extend(added)
+    _enrich_in_background(added, prefetch_images)
+    logger.debug(f"随机天文一图池已补充至 {len(_random_pool)} 条")
+
+
+def _ensure_random_refill() -> asyncio.Task[None]:
+    global _random_refill_task
+    if _random_refill_task is None or _random_refill_task.done():
+        _random_refill_task = asyncio.create_task(_refill_random_pool())
+    return _random_refill_task
+
+
+async def fetch_randomly_apod_data() -> dict | None:
+    if not _random_pool:
+        await asyncio.shield(_ensure_random_refill())
+    elif len(_random_pool) <= random_pool_low_water:
+        _ensure_random_refill()
+    if _random_pool:
+        return _random_pool.popleft()
+    return None
+
+
+async def backfill_apod_archive(start: date, end: date) -> int:
+    # 当日数据可能仍会被修订, 归档截止到昨天
+    end = min(end, date.today() - timedelta(days=1))
+    added = 0
+    step = timedelta(days=max(backfill_chunk_days, 1))
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + step - timedelta(days=1), end)
+        first, last = chunk_start.isoformat(), chunk_end.isoformat()
+        days = (chunk_end - chunk_start).days + 1
+        chunk_start = chunk_end + timedelta(days=1)
+        # 已完整归档的区间不再请求
+        if await count_archived_apod(first, last) >= days:
+            continue
+        records = await _request_upstream(
+            partial(_request_records, params={"start_date": first, "end_date": last}),
+            ranges=True,
+            hedge=False,
+        )
+        if records is not None:
+            added += await archive_apod_records(records)
+            if backfill_translate:
+                await asyncio.gather(*(enrich_apod_record(r) for r in records))
+            logger.info(f"已归档 {first} 至 {last} 的天文一图, 累计新增 {added} 条")
+        else:
+            logger.warning(f"归档 {first} 至 {last} 的天文一图失败")
+        if chunk_start <= end:
+            await asyncio.sleep(backfill_interval)
+    return added
@@ -0,0 +1,172 @@
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+import pytest
+
+
+def _get_apod():
+    import nonebot_plugin_apod.apod as apod
+
+    return apod
+
+
+class TestGetPrewarmTime:
+    @pytest.mark.parametrize(
+        ("send_times", "expected"),
+        [
+            (["13:00"], (12, 50)),
+            (["18:30", "13:00", "20:00"], (12, 50)),
+            (["09:00", "13:00"], (12, 50)),
+            (["09:00"], (8, 50)),
+            (["12:05"], (12, 1)),
+            (["00:05"], (23, 55)),
+        ],
+    )
+    def test_lead_before_earliest_send_after_cache_clear(self, send_times, expected):
+        apod = _get_apod()
+        assert apod.get_prewarm_time(send_times, 10) == expected
+
+    def test_disabled_without_lead_or_tasks(self):
+        apod = _get_apod()
+        assert apod.get_prewarm_time(["13:00"], 0) is None
+        assert apod.get_prewarm_time([], 10) is None
+
+
+class TestPrewarmApod:
+    async def test_renders_and_caches_image(self, monkeypatch):
+        from nonebot_plugin_apod.models import ApodRecord
+        import nonebot_plugin_apod.infopuzzle as infopuzzle
+        from nonebot_plugin_apod.config import get_cache_image, clear_cache_image
+
+        apod = _get_apod()
+        await clear_cache_image()
+        today = datetime.now().strftime("%Y-%m-%d")
+        record = ApodRecord.from_dict(
+            {"media_type": "image", "url": "https://example.com/a.jpg", "date": today}
+        )
+        monkeypatch.setattr(apod, "ensure_apod_data", AsyncMock(return_value=record))
+        generate = AsyncMock(return_value=infopuzzle.RenderResult(b"png"))
+        monkeypatch.setattr(apod, "generate_apod_image", generate)
+        monkeypatch.setattr(apod, "apod_infopuzzle", True)
+
+        await apod.prewarm_apod()
+        await apod.prewarm_apod()
+        assert await get_cache_image(today) == b"png"
+        generate.assert_awaited_once()
+        await clear_cache_image()
+
+    async def test_skips_record_from_previous_day(self, monkeypatch):
+        from nonebot_plugin_apod.models import ApodRecord
+        import nonebot_plugin_apod.infopuzzle as infopuzzle
+        from nonebot_plugin_apod.config import get_cache_image, clear_cache_image
+
+        apod = _get_apod()
+        await clear_cache_image()
+        record = ApodRecord.from_dict(
+            {
+                "media_type": "image",
+                "url": "https://example.com/a.jpg",
+                "date": "2024-01-01",
+            }
+        )
+        monkeypatch.setattr(apod, "ensure_apod_data", AsyncMock(return_value=record))
+        generate = AsyncMock(return_value=infopuzzle.RenderResult(b"png"))
+        monkeypatch.setattr(apod, "generate_apod_image", generate)
+        monkeypatch.setattr(apod, "apod_infopuzzle", True)
+
+        await apod.prewarm_apod()
+        generate.assert_not_awaited()
+        assert await get_cache_image("2024-01-01") is None
+
+    async def test_degraded_render_is_not_cached(self, monkeypatch):
+        import nonebot_plugin_apod.infopuzzle as infopuzzle
+        from nonebot_plugin_apod.models import ApodRecord
+        from nonebot_plugin_apod.config import get_cache_image, clear_cache_image
+
+        apod = _get_apod()
+        await clear_cache_image()
+        record = ApodRecord.from_dict(
+            {"media_type": "image", "url": "https://example.com/a.jpg"}
+        )
+        monkeypatch.setattr(apod, "ensure_apod_data", AsyncMock(return_value=record))
+        generate = AsyncMock(
+            return_value=infopuzzle.RenderResult(b"png", degraded=True)
+        )
+        monkeypatch.setattr(apod, "generate_apod_image", generate)
+        monkeypatch.setattr(apod, "apod_infopuzzle", True)
+
+        content = await apod.prepare_apod_content()
+        assert content.image == b"png"
+        assert await get_cache_image(record.date) is None
+        await apod.prepare_apod_content()
+        assert generate.await_count == 2
+
+
+class TestBroadcastApod:
+    async def test_one_job_per_send_time(self):
+        from nonebot_plugin_apscheduler import scheduler
+        from nonebot_plugin_alconna.uniseg import Target
+
+        apod = _get_apod()
+        tasks = [
+            {"send_time": "13:00", "target": Target("1", self_id="bot")},
+            {"send_time": "13:00", "target": Target("2", self_id="bot")},
+            {"send_time": "9:05", "target": Target("3", self_id="bot")},
+        ]
+        apod.sync_apod_jobs(tasks)
+        slot_jobs = {
+            job.id
+            for job in scheduler.get_jobs()
+            if job.id.startswith(apod.SLOT_JOB_PREFIX)
+        }
+        assert slot_jobs == {
+            apod.generate_slot_job_id("13:00"),
+            apod.generate_slot_job_id("09:05"),
+        }
+
+        apod.sync_apod_jobs(tasks[:1])
+        assert scheduler.get_job(apod.generate_slot_job_id("09:05")) is None
+        apod.sync_apod_jobs([])
+        assert scheduler.get_job(apod.generate_slot_job_id("13:00")) is None
+
+    async def test_fans_out_over_slot_targets(self, monkeypatch):
+        from nonebot_plugin_alconna.uniseg import Target
+
+        from nonebot_plugin_apod.models import ApodRecord
+
+        apod = _get_apod()
+        tasks = [
+            {"send_time": "13:00", "target": Target(str(i), self_id="bot")}
+            for i in range(5)
+        ]
+        tasks.append({"send_time": "13:00", "target": Target("x", self_id="gone")})
+        tasks.append({"send_time": "14:00", "target": Target("y", self_id="bot")})
+        content = apod.ApodContent(ApodRecord.from_dict({"media_type": "image"}))
+        prepare = AsyncMock(return_value=content)
+        delivered = []
+
+        async def fake_deliver(target, bot, shared_content):
+            assert shared_content is content
+            if target.id == "4":
+                raise RuntimeError("send failed")
+            delivered.append(target.id)
+
+        def fake_get_bot(self_id):
+            if self_id != "bot":
+                raise KeyError(self_id)
+            return object()
+
+        monkeypatch.setattr(apod, "load_task_configs", AsyncMock(return_value=tasks))
+        monkeypatch.setattr(apod, "prepare_apod_content", prepare)
+        monkeypatch.setattr(apod, "deliver_apod", fake_deliver)
+        monkeypatch.setattr(apod, "get_bot", fake_get_bot)
+
+        stats = await apod.broadcast_apod("13:00")
+        prepare.assert_awaited_once()
+        assert sorted(delivered) == ["0", "1", "2", "3"]
+        assert (stats.total, stats.succeeded, stats.failed, stats.skipped) == (
+            6,
+            4,
+            1,
+            1,
+        )
@@ -3,7 +3,7 @@ class TestCacheImage:
         from nonebot_plugin_apod.config import get_cache_image, clear_cache_image
 
         await clear_cache_image()
-        assert await get_cache_image() is None
+        assert await get_cache_image("2024-01-01") is None
 
     async def test_set_then_get(self):
         from nonebot_plugin_apod.config import (
@@ -13,8 +13,8 @@ class TestCacheImage:
         )
 
         data = b"fake_image_bytes"
-        await set_cache_image(data)
-        assert await get_cache_image() == data
+        await set_cache_image("2024-01-01", data)
+        assert await get_cache_image("2024-01-01") == data
         await clear_cache_image()
 
     async def test_clear(self):
@@ -24,9 +24,9 @@ class TestCacheImage:
             set_cache_image,
         )
 
-        await set_cache_image(b"data")
+        await set_cache_image("2024-01-01", b"data")
         await clear_cache_image()
-        assert await get_cache_image() is None
+        assert await get_cache_image("2024-01-01") is None
 
     async def test_overwrite(self):
         from nonebot_plugin_apod.config import (
@@ -35,7 +35,19 @@ class TestCacheImage:
             set_cache_image,
         )
 
-        await set_cache_image(b"first")
-        await set_cache_image(b"second")
-        assert await get_cache_image() == b"second"
+        await set_cache_image("2024-01-01", b"first")
+        await set_cache_image("2024-01-01", b"second")
+        assert await get_cache_image("2024-01-01") == b"second"
+        await clear_cache_image()
+
+    async def test_keyed_by_date(self):
+        from nonebot_plugin_apod.config import (
+            clear_cache_image,
+            get_cache_image,
+            set_cache_image,
+        )
+
+        await set_cache_image("2024-01-01", b"yesterday")
+        assert await get_cache_image("2024-01-02") is None
+        assert await get_cache_image("2024-01-01") == b"yesterday"
         await clear_cache_image()
@@ -1,6 +1,10 @@
 import json
+import asyncio
+from datetime import datetime
+from collections import OrderedDict
 
 import httpx
+import pytest
 import respx
 
 
@@ -20,6 +24,29 @@ def _get_utils():
     return utils
 
 
+@pytest.fixture(autouse=True)
+def fresh_upstream_pool(monkeypatch):
+    monkeypatch.setattr(_get_utils(), "_upstream_pool", None)
+
+
+@pytest.fixture(autouse=True)
+def fresh_random_pool(monkeypatch):
+    from collections import deque
+
+    monkeypatch.setattr(_get_utils(), "_random_pool", deque())
+    monkeypatch.setattr(_get_utils(), "_random_refill_task", None)
+
+
+@pytest.fixture(autouse=True)
+def archive(tmp_path, monkeypatch):
+    import nonebot_plugin_apod.archive as archive
+
+    archive.close_archive_db()
+    monkeypatch.setattr(archive, "archive_db_file", tmp_path / "archive.db")
+    yield archive
+    archive.close_archive_db()
+
+
 class TestFetchApodDataByDate:
     @respx.mock
     async def test_returns_dict_response(self):
@@ -77,14 +104,41 @@ class TestFetchRandomlyApodData:
         assert result["title"] == "Test Nebula"
 
     @respx.mock
-    async def test_returns_dict_directly(self):
+    async def test_rejects_single_record_reply(self):
         utils = _get_utils()
         respx.get(utils.NASA_API_URL).mock(
             return_value=httpx.Response(200, json=SAMPLE_APOD)
         )
+        assert await utils.fetch_randomly_apod_data() is None
+
+    @respx.mock
+    async def test_only_range_capable_upstreams_are_used(self, monkeypatch):
+        utils = _get_utils()
+        from nonebot_plugin_apod.config import MirrorConfig
+
+        monkeypatch.setattr(
+            utils,
+            "mirrors",
+            [
+                MirrorConfig(url="https://plain.example/apod"),
+                MirrorConfig(url="https://ranged.example/apod", supports_ranges=True),
+            ],
+        )
+        plain = respx.get("https://plain.example/apod").mock(
+            return_value=httpx.Response(200, json=SAMPLE_APOD)
+        )
+        ranged = respx.get("https://ranged.example/apod").mock(
+            return_value=httpx.Response(200, json=SAMPLE_APOD)
+        )
+        nasa = respx.get(utils.NASA_API_URL).mock(
+            return_value=httpx.Response(200, json=[SAMPLE_APOD])
+        )
         result = await utils.fetch_randomly_apod_data()
         assert result is not None
         assert result["title"] == "Test Nebula"
+        assert plain.call_count == 0
+        assert ranged.call_count == 1
+        assert nasa.call_count == 1
 
     @respx.mock
     async def test_returns_none_on_empty_list(self):
@@ -102,6 +156,42 @@ class TestFetchRandomlyApodData:
         result = await utils.fetch_randomly_apod_data()
         assert result is None
 
+    @respx.mock
+    async def test_pool_filters_videos_and_serves_from_memory(self, monkeypatch):
+        utils = _get_utils()
+        monkeypatch.setattr(utils, "random_pool_low_water", 0)
+        video = {**SAMPLE_APOD, "date": "2023-10-02", "media_type": "video"}
+        second = {**SAMPLE_APOD, "date": "2023-10-03", "title": "Second"}
+        route = respx.get(utils.NASA_API_URL).mock(
+            return_value=httpx.Response(200, json=[SAMPLE_APOD, video, second])
+        )
+        first = await utils.fetch_randomly_apod_data()
+        assert first is not None
+        assert first["title"] == "Test Nebula"
+        assert route.calls.last.request.url.params["count"] == str(
+            utils.random_pool_size
+        )
+        last = await utils.fetch_randomly_apod_data()
+        assert last is not None
+        assert last["title"] == "Second"
+        assert route.call_count == 1
+
+    @respx.mock
+    async def test_refills_in_background_at_low_water(self, monkeypatch):
+        utils = _get_utils()
+        monkeypatch.setattr(utils, "random_pool_low_water", 1)
+        utils._random_pool.extend([SAMPLE_APOD])
+        route = respx.get(utils.NASA_API_URL).mock(
+            return_value=httpx.Response(
+                200, json=[{**SAMPLE_APOD, "date": "2023-10-05"}]
+            )
+        )
+        assert await utils.fetch_randomly_apod_data() == SAMPLE_APOD
+        assert utils._random_refill_task is not None
+        await utils._random_refill_task
+        assert route.call_count == 1
+        assert len(utils._random_pool) == 1
+
 
 class TestFetchApodData:
     @respx.mock
@@ -133,3 +223,452 @@ class TestFetchApodData:
         respx.get(utils.NASA_API_URL).mock(side_effect=httpx.ConnectError("fail"))
         result = await utils.fetch_apod_data()
         assert result is False
+
+
+class TestFetchDataOnce:
+    @respx.mock
+    async def test_concurrent_callers_share_one_request(self, tmp_path, monkeypatch):
+        utils = _get_utils()
+        monkeypatch.setattr(utils, "apod_cache_json", tmp_path / "apod.json")
+        monkeypatch.setattr(utils, "mirror_url", None)
+        monkeypatch.setattr(utils, "_fetch_failures", {})
+        route = respx.get(utils.NASA_API_URL).mock(
+            return_value=httpx.Response(200, json=SAMPLE_APOD)
+        )
+        results = await asyncio.gather(*(utils.fetch_data_once() for _ in range(10)))
+        assert all(results)
+        assert route.call_count == 1
+
+    @respx.mock
+    async def test_failure_is_negatively_cached(self, tmp_path, monkeypatch):
+        utils = _get_utils()
+        monkeypatch.setattr(utils, "apod_cache_json", tmp_path / "apod.json")
+        monkeypatch.setattr(utils, "mirror_url", None)
+        monkeypatch.setattr(utils, "_fetch_failures", {})
+        route = respx.get(utils.NASA_API_URL).mock(
+            return_value=httpx.Response(500, text="error")
+        )
+        assert await utils.fetch_data_once() is False
+        assert await utils.fetch_data_once() is False
+        assert route.call_count == 1
+
+    @respx.mock
+    async def test_retries_after_failure_ttl(self, tmp_path, monkeypatch):
+        utils = _get_utils()
+        monkeypatch.setattr(utils, "apod_cache_json", tmp_path / "apod.json")
+        monkeypatch.setattr(utils, "mirror_url", None)
+        monkeypatch.setattr(utils, "_fetch_failures", {})
+        monkeypatch.setattr(utils, "fetch_failure_ttl", 0)
+        route = respx.get(utils.NASA_API_URL).mock(
+            return_value=httpx.Response(500, text="error")
+        )
+        assert await utils.fetch_data_once() is False
+        assert await utils.fetch_data_once() is False
+        assert route.call_count == 2
+
+
+class TestEnsureApodData:
+    @respx.mock
+    async def test_returns_record_and_reuses_memory(self, tmp_path, monkeypatch):
+        utils = _get_utils()
+        today = datetime.now().strftime("%Y-%m-%d")
+        monkeypatch.setattr(utils, "apod_cache_json", tmp_path / "apod.json")
+        monkeypatch.setattr(utils, "mirror_url", None)
+        monkeypatch.setattr(utils, "_fetch_failures", {})
+        monkeypatch.setattr(utils, "_apod_records", {})
+        route = respx.get(utils.NASA_API_URL).mock(
+            return_value=httpx.Response(200, json={**SAMPLE_APOD, "date": today})
+        )
+        record = await utils.ensure_apod_data()
+        assert record is not None
+        assert record.title == "Test Nebula"
+        assert record.is_image
+        assert await utils.ensure_apod_data() is record
+        assert route.call_count == 1
+
+    async def test_loads_from_disk_on_warm_restart(self, tmp_path, monkeypatch):
+        utils = _get_utils()
+        today = datetime.now().strftime("%Y-%m-%d")
+        cache_file = tmp_path / "apod.json"
+        cache_file.write_text(json.dumps({**SAMPLE_APOD, "date": today}))
+        monkeypatch.setattr(utils, "apod_cache_json", cache_file)
+        monkeypatch.setattr(utils, "_apod_records", {})
+        record = await utils.ensure_apod_data()
+        assert record is not None
+        assert record.date == today
+        assert record.image_url(hd=True) == SAMPLE_APOD["hdurl"]
+
+    async def test_record_is_immutable(self):
+        from dataclasses import FrozenInstanceError
+
+        from nonebot_plugin_apod.models import ApodRecord
+
+        record = ApodRecord.from_dict(SAMPLE_APOD)
+        with pytest.raises(FrozenInstanceError):
+            record.title = "changed"  # type: ignore[misc]
+
+
+class TestHedgedRequests:
+    async def test_fast_primary_skips_secondary(self):
+        from nonebot_plugin_apod.hedge import hedged
+
+        calls = []
+
+        async def primary():
+            return "mirror"
+
+        async def secondary():
+            calls.append("nasa")
+            return "nasa"
+
+        result = await hedged(primary, secondary, 0.5)
+        assert result == "mirror"
+        assert calls == []
+
+    async def test_slow_primary_is_hedged_and_cancelled(self):
+        from nonebot_plugin_apod.hedge import hedged
+
+        cancelled = asyncio.Event()
+
+        async def primary():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return "mirror"
+
+        async def secondary():
+            return "nasa"
+
+        result = await hedged(primary, secondary, 0.01)
+        assert result == "nasa"
+        assert cancelled.is_set()
+
+    async def test_primary_failure_falls_back_immediately(self):
+        from nonebot_plugin_apod.hedge import hedged
+
+        async def primary():
+            return None
+
+        async def secondary():
+            return "nasa"
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await hedged(primary, secondary, 5)
+        assert result == "nasa"
+        assert loop.time() - start < 1
+
+    async def test_delay_follows_latency_percentile(self):
+        from nonebot_plugin_apod.hedge import LatencyTracker
+
+        tracker = LatencyTracker()
+        assert tracker.percentile(0.9) is None
+        for i in range(1, 11):
+            tracker.record(i / 10)
+        assert tracker.percentile(0.9) == 1.0
+        assert tracker.percentile(0.5) == 0.6
+
+
+class TestUpstreamPool:
+    def _pool(self, monkeypatch, *urls):
+        utils = _get_utils()
+        from nonebot_plugin_apod.upstream import Endpoint, UpstreamPool
+
+        pool = UpstreamPool([Endpoint(url, "key") for url in urls])
+        pool.endpoints.append(utils._nasa_endpoint())
+        monkeypatch.setattr(utils, "_upstream_pool", pool)
+        return pool
+
+    @respx.mock
+    async def test_fetch_data_persists_hedged_result_once(self, tmp_path, monkeypatch):
+        utils = _get_utils()
+        import nonebot_plugin_apod.upstream as upstream
+
+        monkeypatch.setattr(utils, "apod_cache_json", tmp_path / "apod.json")
+        monkeypatch.setattr(upstream, "hedge_enabled", True)
+        monkeypatch.setattr(upstream, "hedge_delay", 0.01)
+        self._pool(monkeypatch, "https://mirror.example/apod")
+
+        async def slow_mirror(request):
+            await asyncio.sleep(5)
+            return httpx.Response(200, json={**SAMPLE_APOD, "title": "Mirror"})
+
+        respx.get("https://mirror.example/apod").mock(side_effect=slow_mirror)
+        respx.get(utils.NASA_API_URL).mock(
+            return_value=httpx.Response(200, json=SAMPLE_APOD)
+        )
+        assert await utils.fetch_data() is True
+        saved = json.loads((tmp_path / "apod.json").read_text())
+        assert saved["title"] == "Test Nebula"
+
+    @respx.mock
+    async def test_range_requests_are_not_hedged(self, monkeypatch):
+        from datetime import date
+
+        utils = _get_utils()
+        import nonebot_plugin_apod.upstream as upstream
+
+        monkeypatch.setattr(upstream, "hedge_enabled", True)
+        monkeypatch.setattr(upstream, "hedge_delay", 0.01)
+        monkeypatch.setattr(utils, "backfill_interval", 0)
+        pool = self._pool(monkeypatch, "https://mirror.example/apod")
+        pool.endpoints[0].supports_ranges = True
+
+        async def slow_mirror(request):
+            await asyncio.sleep(0.1)
+            return httpx.Response(200, json=[SAMPLE_APOD])
+
+        mirror = respx.get("https://mirror.example/apod").mock(side_effect=slow_mirror)
+        nasa = respx.get(utils.NASA_API_URL).mock(
+            return_value=httpx.Response(200, json=[SAMPLE_APOD])
+        )
+        day = date(2023, 10, 1)
+        assert await utils.backfill_apod_archive(day, day) == 1
+        assert await utils.fetch_randomly_apod_data() is not None
+        assert mirror.call_count == 2
+        assert nasa.call_count == 0
+
+    @respx.mock
+    async def test_failing_mirror_is_demoted_and_tripped(self, monkeypatch):
+        utils = _get_utils()
+        import nonebot_plugin_apod.upstream as upstream
+
+        monkeypatch.setattr(upstream, "hedge_enabled", False)
+        monkeypatch.setattr(upstream, "failure_threshold", 2)
+        pool = self._pool(monkeypatch, "https://bad.example/apod")
+        bad = respx.get("https://bad.example/apod").mock(
+            return_value=httpx.Response(503)
+        )
+        respx.get(utils.NASA_API_URL).mock(
+            return_value=httpx.Response(200, json=SAMPLE_APOD)
+        )
+        for _ in range(3):
+            assert await utils.fetch_apod_data_by_date("2023-10-01") == SAMPLE_APOD
+        assert bad.call_count == 1
+        mirror = pool.endpoints[0]
+        assert mirror.error_rate > 0
+        assert pool.ranked()[0].name == "api.nasa.gov"
+
+    @respx.mock
+    async def test_request_errors_leave_health_untouched(self, monkeypatch):
+        utils = _get_utils()
+        import nonebot_plugin_apod.upstream as upstream
+
+        monkeypatch.setattr(upstream, "hedge_enabled", False)
+        monkeypatch.setattr(upstream, "failure_threshold", 2)
+        pool = self._pool(monkeypatch, "https://mirror.example/apod")
+        mirror = respx.get("https://mirror.example/apod").mock(
+            return_value=httpx.Response(400, json={"msg": "Date must be before"})
+        )
+        nasa = respx.get(utils.NASA_API_URL).mock(return_value=httpx.Response(400))
+        for _ in range(3):
+            assert await utils.fetch_apod_data_by_date("2099-01-01") is None
+        assert mirror.call_count == 3
+        assert nasa.call_count == 0
+        assert all(e.error_rate == 0 and not e.is_open for e in pool.endpoints)
+
+    @respx.mock
+    async def test_rejected_mirrors_count_as_failures_and_fail_over(
+        self, tmp_path, monkeypatch
+    ):
+        utils = _get_utils()
+        import nonebot_plugin_apod.upstream as upstream
+
+        monkeypatch.setattr(utils, "apod_cache_json", tmp_path / "apod.json")
+        monkeypatch.setattr(upstream, "hedge_enabled", False)
+        pool = self._pool(
+            monkeypatch, "https://limited.example/apod", "https://badkey.example/apod"
+        )
+        limited = respx.get("https://limited.example/apod").mock(
+            return_value=httpx.Response(429)
+        )
+        badkey = respx.get("https://badkey.example/apod").mock(
+            return_value=httpx.Response(401)
+        )
+        nasa = respx.get(utils.NASA_API_URL).mock(
+            return_value=httpx.Response(200, json=SAMPLE_APOD)
+        )
+        assert await utils.fetch_data() is True
+        assert limited.call_count == badkey.call_count == nasa.call_count == 1
+        assert [e.failures for e in pool.endpoints] == [1, 1, 0]
+        assert pool.ranked()[0].name == "api.nasa.gov"
+
+    @respx.mock
+    async def test_invalid_json_counts_as_failure(self, monkeypatch):
+        utils = _get_utils()
+        import nonebot_plugin_apod.upstream as upstream
+
+        monkeypatch.setattr(upstream, "hedge_enabled", False)
+        pool = self._pool(monkeypatch, "https://mirror.example/apod")
+        respx.get("https://mirror.example/apod").mock(
+            return_value=httpx.Response(200, text="<html>")
+        )
+        respx.get(utils.NASA_API_URL).mock(
+            return_value=httpx.Response(200, json=SAMPLE_APOD)
+        )
+        assert await utils.fetch_apod_data_by_date("2023-10-01") == SAMPLE_APOD
+        assert pool.endpoints[0].error_rate > 0
+
+    def test_open_circuit_is_skipped(self, monkeypatch):
+        import nonebot_plugin_apod.upstream as upstream
+
+        monkeypatch.setattr(upstream, "failure_threshold", 1)
+        pool = self._pool(
+            monkeypatch, "https://a.example/apod", "https://b.example/apod"
+        )
+        pool.endpoints[0].record_failure()
+        assert pool.endpoints[0].is_open
+        assert [e.name for e in pool.ranked()] == ["b.example", "api.nasa.gov"]
+
+    def test_all_open_still_returns_endpoints(self, monkeypatch):
+        import nonebot_plugin_apod.upstream as upstream
+
+        monkeypatch.setattr(upstream, "failure_threshold", 1)
+        pool = self._pool(monkeypatch)
+        pool.endpoints[0].record_failure()
+        assert len(pool.ranked()) == 1
+
+    def test_untried_endpoints_keep_configured_order(self, monkeypatch):
+        pool = self._pool(monkeypatch, "https://mirror.example/apod")
+        pool.endpoints[0].record_success(0.5)
+        assert [e.name for e in pool.ranked()] == ["mirror.example", "api.nasa.gov"]
+        pool.endpoints[0].record_success(3.0)
+        assert pool.ranked()[0].name == "mirror.example"
+
+    def test_prefers_lower_latency(self, monkeypatch):
+        pool = self._pool(monkeypatch, "https://slow.example/apod")
+        pool.endpoints[0].record_success(2.0)
+        pool.endpoints[1].record_success(0.2)
+        assert pool.ranked()[0].name == "api.nasa.gov"
+
+
+class TestArchive:
+    @respx.mock
+    async def test_date_lookup_is_archived(self):
+        utils = _get_utils()
+        route = respx.get(utils.NASA_API_URL).mock(
+            return_value=httpx.Response(200, json=SAMPLE_APOD)
+        )
+        assert await utils.fetch_apod_data_by_date("2023-10-01") == SAMPLE_APOD
+        assert await utils.fetch_apod_data_by_date("2023-10-01") == SAMPLE_APOD
+        assert route.call_count == 1
+
+    @respx.mock
+    async def test_today_is_not_archived(self, archive):
+        utils = _get_utils()
+        today = datetime.now().strftime("%Y-%m-%d")
+        respx.get(utils.NASA_API_URL).mock(
+            return_value=httpx.Response(200, json={**SAMPLE_APOD, "date": today})
+        )
+        assert await utils.fetch_apod_data_by_date(today)
+        assert await archive.get_archived_apod(today) is None
+
+    @respx.mock
+    async def test_backfill_in_chunks_and_skips_archived(self, archive, monkeypatch):
+        from datetime import date, timedelta
+
+        utils = _get_utils()
+        monkeypatch.setattr(utils, "backfill_chunk_days", 2)
+        monkeypatch.setattr(utils, "backfill_interval", 0)
+
+        def respond(request):
+            start = date.fromisoformat(request.url.params["start_date"])
+            end = date.fromisoformat(request.url.params["end_date"])
+            days = (end - start).days + 1
+            return httpx.Response(
+                200,
+                json=[
+                    {**SAMPLE_APOD, "date": (start + timedelta(i)).isoformat()}
+                    for i in range(days)
+                ],
+            )
+
+        route = respx.get(utils.NASA_API_URL).mock(side_effect=respond)
+        start, end = date(2023, 10, 1), date(2023, 10, 5)
+        assert await utils.backfill_apod_archive(start, end) == 5
+        assert route.call_count == 3
+        assert await archive.count_archived_apod("2023-10-01", "2023-10-05") == 5
+        assert await utils.backfill_apod_archive(start, end) == 0
+        assert route.call_count == 3
+        record = await utils.fetch_apod_data_by_date("2023-10-03")
+        assert record is not None
+        assert record["date"] == "2023-10-03"
+        assert route.call_count == 3
+
+
+class TestEnrichment:
+    @respx.mock
+    async def test_random_pool_is_pretranslated_and_prefetched(
+        self, tmp_path, monkeypatch
+    ):
+        utils = _get_utils()
+        import nonebot_plugin_apod.trans_cache as trans_cache
+        import nonebot_plugin_apod.http_cache as http_cache
+
+        trans_cache.close_translation_db()
+        monkeypatch.setattr(trans_cache, "translation_db_file", tmp_path / "t.db")
+        monkeypatch.setattr(http_cache, "http_cache_dir", tmp_path / "http")
+        monkeypatch.setattr(utils, "deepl_trans", True)
+        monkeypatch.setattr(utils, "prefetch_images", True)
+        monkeypatch.setattr(utils, "_prefetched_images", OrderedDict())
+        calls = []
+
+        async def fake_deepl(text):
+            calls.append(text)
+            return "一片美丽的星云。"
+
+        monkeypatch.setattr(utils, "deepl_translate_text", fake_deepl)
+        respx.get(utils.NASA_API_URL).mock(
+            return_value=httpx.Response(200, json=[SAMPLE_APOD])
+        )
+        respx.get(SAMPLE_APOD["url"]).mock(
+            return_value=httpx.Response(200, content=b"jpeg-bytes")
+        )
+        await utils._refill_random_pool()
+        await asyncio.gather(*utils._enrich_tasks)
+        record = await utils.fetch_randomly_apod_data()
+        assert record is not None
+        assert calls == [SAMPLE_APOD["explanation"]]
+        assert await utils.translate_text_auto(record["explanation"]) == (
+            "一片美丽的星云。"
+        )
+        assert calls == [SAMPLE_APOD["explanation"]]
+        assert utils.pop_prefetched_image(record["url"]) == b"jpeg-bytes"
+        assert utils.pop_prefetched_image(record["url"]) is None
+        trans_cache.close_translation_db()
+
+    @respx.mock
+    async def test_oversized_image_is_not_prefetched(self, monkeypatch):
+        utils = _get_utils()
+        monkeypatch.setattr(utils, "prefetch_image_max_bytes", 4)
+        monkeypatch.setattr(utils, "_prefetched_images", OrderedDict())
+        respx.get(SAMPLE_APOD["url"]).mock(
+            return_value=httpx.Response(200, content=b"too-large")
+        )
+        await utils.enrich_apod_record(SAMPLE_APOD, prefetch_image=True)
+        assert utils.pop_prefetched_image(SAMPLE_APOD["url"]) is None
+
+    @respx.mock
+    async def test_prefetched_images_follow_random_pool(self, monkeypatch):
+        utils = _get_utils()
+        monkeypatch.setattr(utils, "random_pool_size", 2)
+        monkeypatch.setattr(utils, "_prefetched_images", OrderedDict())
+        records = [
+            {**SAMPLE_APOD, "date": f"2023-10-0{i}", "url": f"https://x.test/{i}.jpg"}
+            for i in range(1, 4)
+        ]
+        for record in records:
+            respx.get(record["url"]).mock(
+                return_value=httpx.Response(200, content=record["url"].encode())
+            )
+        # 记录已离开随机池时, 下载完成的图片直接丢弃
+        await utils.enrich_apod_record(records[0], prefetch_image=True)
+        assert not utils._prefetched_images
+        utils._random_pool.extend(records)
+        for record in records:
+            await utils.enrich_apod_record(record, prefetch_image=True)
+        assert list(utils._prefetched_images) == [r["url"] for r in records[1:]]
+        utils.clear_prefetched_images()
+        assert utils.pop_prefetched_image(records[2]["url"]) is None
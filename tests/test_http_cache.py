@@ -0,0 +1,71 @@
+import httpx
+import pytest
+import respx
+
+URL = "https://api.example.com/apod"
+
+
+@pytest.fixture
+def http_cache(tmp_path, monkeypatch):
+    import nonebot_plugin_apod.http_cache as http_cache
+
+    monkeypatch.setattr(http_cache, "http_cache_dir", tmp_path)
+    return http_cache
+
+
+class TestConditionalGet:
+    @respx.mock
+    async def test_revalidates_with_etag(self, http_cache):
+        route = respx.get(URL).mock(
+            side_effect=[
+                httpx.Response(200, json={"title": "Nebula"}, headers={"ETag": '"v1"'}),
+                httpx.Response(304),
+            ]
+        )
+        async with httpx.AsyncClient() as client:
+            first = await http_cache.conditional_get(client, URL, params={"a": 1})
+            second = await http_cache.conditional_get(client, URL, params={"a": 1})
+        assert first.json() == second.json() == {"title": "Nebula"}
+        assert second.status_code == 200
+        assert "If-None-Match" not in route.calls[0].request.headers
+        assert route.calls[1].request.headers["If-None-Match"] == '"v1"'
+
+    @respx.mock
+    async def test_revalidates_with_last_modified(self, http_cache):
+        last_modified = "Mon, 01 Jan 2024 00:00:00 GMT"
+        route = respx.get(URL).mock(
+            side_effect=[
+                httpx.Response(
+                    200, content=b"img", headers={"Last-Modified": last_modified}
+                ),
+                httpx.Response(304),
+            ]
+        )
+        async with httpx.AsyncClient() as client:
+            await http_cache.conditional_get(client, URL)
+            cached = await http_cache.conditional_get(client, URL)
+        assert cached.content == b"img"
+        assert route.calls[1].request.headers["If-Modified-Since"] == last_modified
+
+    @respx.mock
+    async def test_without_validators_nothing_is_stored(self, http_cache, tmp_path):
+        respx.get(URL).mock(return_value=httpx.Response(200, content=b"body"))
+        async with httpx.AsyncClient() as client:
+            await http_cache.conditional_get(client, URL)
+        assert not list(tmp_path.iterdir())
+
+    @respx.mock
+    async def test_errors_are_not_cached(self, http_cache, tmp_path):
+        respx.get(URL).mock(return_value=httpx.Response(500, headers={"ETag": "x"}))
+        async with httpx.AsyncClient() as client:
+            response = await http_cache.conditional_get(client, URL)
+        with pytest.raises(httpx.HTTPStatusError):
+            response.raise_for_status()
+        assert not list(tmp_path.iterdir())
+
+    @respx.mock
+    async def test_max_bytes(self, http_cache):
+        respx.get(URL).mock(return_value=httpx.Response(200, content=b"x" * 100))
+        async with httpx.AsyncClient() as client:
+            with pytest.raises(http_cache.ResponseTooLarge):
+                await http_cache.conditional_get(client, URL, max_bytes=10)
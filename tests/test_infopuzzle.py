@@ -1,7 +1,12 @@
+import asyncio
+import os
 from unittest.mock import patch, AsyncMock
 from io import BytesIO
 
-from PIL import Image, ImageDraw, ImageFont
+import httpx
+import pytest
+import respx
+from PIL import Image, ImageDraw, ImageFont, features
 
 
 def _get_infopuzzle():
@@ -48,6 +53,62 @@ class TestWrapText:
         lines = infopuzzle._wrap_text(draw, "ABC", font, max_width=1)
         assert len(lines) == 3
 
+    def test_matches_per_char_measurement(self):
+        infopuzzle = _get_infopuzzle()
+        img = Image.new("RGB", (1, 1))
+        draw = ImageDraw.Draw(img)
+        font = ImageFont.load_default(16)
+        text = (
+            "The Andromeda Galaxy (M31) is 2.5 million light-years away.\n"
+            "仙女座星系距离我们约250万光年, AVATAR WAVE Ty Te 是最近的大型星系。"
+        ) * 5
+
+        def legacy_wrap(paragraphs: str, max_width: int) -> list[str]:
+            lines: list[str] = []
+            for paragraph in paragraphs.split("\n"):
+                if not paragraph:
+                    lines.append("")
+                    continue
+                line = ""
+                for char in paragraph:
+                    if draw.textlength(line + char, font=font) > max_width:
+                        if line:
+                            lines.append(line)
+                        line = char
+                    else:
+                        line += char
+                if line:
+                    lines.append(line)
+            return lines
+
+        for max_width in (1, 30, 100, 257, 1130):
+            assert infopuzzle._wrap_text(draw, text, font, max_width) == legacy_wrap(
+                text, max_width
+            )
+
+    def test_keep_words_breaks_at_spaces(self):
+        infopuzzle = _get_infopuzzle()
+        img = Image.new("RGB", (1, 1))
+        draw = ImageDraw.Draw(img)
+        font = ImageFont.load_default(16)
+        text = "A beautiful spiral galaxy in the constellation Andromeda"
+        lines = infopuzzle._wrap_text(draw, text, font, 150, keep_words=True)
+        assert len(lines) > 1
+        assert " ".join(lines) == text
+        assert all(word in text.split() for line in lines for word in line.split())
+
+    def test_untranslated_explanation_wraps_at_words(self, monkeypatch):
+        infopuzzle = _get_infopuzzle()
+        font = ImageFont.load_default(16)
+        monkeypatch.setattr(infopuzzle, "_load_fonts", lambda: (font,) * 4)
+        monkeypatch.setattr(infopuzzle, "CONTENT_WIDTH", 150)
+        text = "A beautiful spiral galaxy in the constellation Andromeda"
+        layout = infopuzzle._layout_text("标题", text, "", "")
+        assert layout is not None
+        assert " ".join(layout.body_lines) == text
+        assert infopuzzle._is_latin_text(text)
+        assert not infopuzzle._is_latin_text("一片美丽的 spiral 星系")
+
 
 class TestLoadFont:
     def test_missing_font_returns_none(self, tmp_path, monkeypatch):
@@ -64,6 +125,41 @@ class TestLoadFont:
         result = infopuzzle._load_font(16, bold=True)
         assert result is None
 
+    def test_fonts_are_parsed_once(self, tmp_path, monkeypatch):
+        infopuzzle = _get_infopuzzle()
+        monkeypatch.setattr(infopuzzle, "data_dir", tmp_path)
+        monkeypatch.setattr(infopuzzle, "_font_cache", {})
+        for filename in infopuzzle.FONTS.values():
+            (tmp_path / filename).write_bytes(b"")
+        calls = []
+
+        def fake_truetype(path, size):
+            calls.append((path, size))
+            return object()
+
+        monkeypatch.setattr(infopuzzle.ImageFont, "truetype", fake_truetype)
+        first = infopuzzle._load_font(40, bold=True)
+        assert infopuzzle._load_font(40, bold=True) is first
+        assert infopuzzle._load_font(40) is not first
+        assert len(calls) == 2
+
+    def test_preload_warms_every_font_spec(self, tmp_path, monkeypatch):
+        infopuzzle = _get_infopuzzle()
+        monkeypatch.setattr(infopuzzle, "data_dir", tmp_path)
+        monkeypatch.setattr(infopuzzle, "_font_cache", {})
+        for filename in infopuzzle.FONTS.values():
+            (tmp_path / filename).write_bytes(b"")
+        prebuilt = {
+            size: ImageFont.load_default(size) for size, _ in infopuzzle.FONT_SPECS
+        }
+        monkeypatch.setattr(
+            infopuzzle.ImageFont, "truetype", lambda path, size: prebuilt[size]
+        )
+        infopuzzle._preload_fonts()
+        assert len(infopuzzle._font_cache) == len(infopuzzle.FONT_SPECS)
+        for font in infopuzzle._font_cache.values():
+            assert font in infopuzzle._line_height_cache
+
 
 class TestRoundCorners:
     def test_output_is_rgba(self):
@@ -85,19 +181,27 @@ class TestRoundCorners:
 
 class TestGenerateApodImage:
     async def test_returns_none_without_font(self, tmp_path, monkeypatch):
+        from nonebot_plugin_apod.models import ApodRecord
+
+        import nonebot_plugin_apod.render_cache as render_cache
+
         infopuzzle = _get_infopuzzle()
         monkeypatch.setattr(infopuzzle, "data_dir", tmp_path)
+        monkeypatch.setattr(render_cache, "render_cache_dir", tmp_path / "rendered")
         with patch.object(
             infopuzzle,
             "ensure_apod_data",
             new_callable=AsyncMock,
-            return_value=True,
+            return_value=ApodRecord.from_dict({"media_type": "image"}),
         ):
             result = await infopuzzle.generate_apod_image()
             assert result is None
 
     async def test_returns_png_bytes(self, tmp_path, monkeypatch):
+        import nonebot_plugin_apod.render_cache as render_cache
+
         infopuzzle = _get_infopuzzle()
+        monkeypatch.setattr(render_cache, "render_cache_dir", tmp_path / "rendered")
 
         monkeypatch.setattr(
             infopuzzle,
@@ -105,46 +209,273 @@ class TestGenerateApodImage:
             lambda size, bold=False: ImageFont.load_default(size),
         )
 
+        from nonebot_plugin_apod.models import ApodRecord
+
         monkeypatch.setattr(
             infopuzzle,
             "ensure_apod_data",
-            AsyncMock(return_value=True),
+            AsyncMock(
+                return_value=ApodRecord(
+                    title="Test Nebula",
+                    explanation="A beautiful nebula.",
+                    url="https://example.com/img.jpg",
+                    date="2023-10-01",
+                    media_type="image",
+                )
+            ),
         )
 
-        cache_file = tmp_path / "apod.json"
-        import json
-
-        cache_file.write_text(
-            json.dumps(
-                {
-                    "title": "Test Nebula",
-                    "explanation": "A beautiful nebula.",
-                    "url": "https://example.com/img.jpg",
-                    "date": "2023-10-01",
-                    "media_type": "image",
-                }
-            )
+        small_img = Image.new("RGB", (100, 80), (0, 0, 255))
+        small_buf = BytesIO()
+        small_img.save(small_buf, format="PNG")
+        monkeypatch.setattr(
+            infopuzzle,
+            "_fetch_image",
+            AsyncMock(return_value=small_buf.getvalue()),
         )
-        monkeypatch.setattr(infopuzzle, "apod_cache_json", cache_file)
 
+        result = await infopuzzle.generate_apod_image()
+        assert result is not None
+        assert not result.degraded
+        assert result.image[:8] == b"\x89PNG\r\n\x1a\n"
+
+        img = Image.open(BytesIO(result.image))
+        assert img.format == "PNG"
+        assert img.width == 1200
+
+        fetch_image = AsyncMock(return_value=None)
+        monkeypatch.setattr(infopuzzle, "_fetch_image", fetch_image)
+        assert await infopuzzle.generate_apod_image() == result
+        fetch_image.assert_not_awaited()
+
+    async def test_translate_and_download_overlap(self, tmp_path, monkeypatch):
+        import nonebot_plugin_apod.render_cache as render_cache
+        from nonebot_plugin_apod.models import ApodRecord
+
+        infopuzzle = _get_infopuzzle()
+        monkeypatch.setattr(render_cache, "render_cache_dir", tmp_path / "rendered")
+        monkeypatch.setattr(
+            infopuzzle,
+            "_load_font",
+            lambda size, bold=False: ImageFont.load_default(size),
+        )
         monkeypatch.setattr(
             infopuzzle,
-            "translate_text_auto",
-            AsyncMock(return_value="A beautiful nebula."),
+            "ensure_apod_data",
+            AsyncMock(
+                return_value=ApodRecord(
+                    title="Test Nebula",
+                    explanation="A beautiful nebula.",
+                    url="https://example.com/img.jpg",
+                    date="2023-10-01",
+                    media_type="image",
+                )
+            ),
         )
+        buf = BytesIO()
+        Image.new("RGB", (100, 80), (0, 0, 255)).save(buf, format="PNG")
+
+        translate_started = asyncio.Event()
+        download_started = asyncio.Event()
+
+        # 两个阶段各自等待对方开始, 串行执行时先开始的阶段会超时失败
+        async def translate(text):
+            translate_started.set()
+            await asyncio.wait_for(download_started.wait(), 5)
+            return "一片美丽的星云。", "deepl"
+
+        async def fetch(url):
+            download_started.set()
+            await asyncio.wait_for(translate_started.wait(), 5)
+            return buf.getvalue()
 
-        small_img = Image.new("RGB", (100, 80), (0, 0, 255))
+        monkeypatch.setattr(
+            infopuzzle, "get_cached_translation_text", AsyncMock(return_value=None)
+        )
+        monkeypatch.setattr(infopuzzle, "translate_with_backend", translate)
+        monkeypatch.setattr(infopuzzle, "_fetch_image", fetch)
+        result = await infopuzzle.generate_apod_image()
+        assert result is not None
+        assert not result.degraded
+
+    async def test_late_translation_degrades_and_records_stages(
+        self, tmp_path, monkeypatch
+    ):
+        import nonebot_plugin_apod.render_cache as render_cache
+        from nonebot_plugin_apod.models import ApodRecord
+
+        infopuzzle = _get_infopuzzle()
+        monkeypatch.setattr(render_cache, "render_cache_dir", tmp_path / "rendered")
+        monkeypatch.setattr(infopuzzle, "translate_stage_timeout", 0.05)
+        monkeypatch.setattr(
+            infopuzzle, "get_cached_translation_text", AsyncMock(return_value=None)
+        )
         monkeypatch.setattr(
             infopuzzle,
-            "_fetch_image",
-            AsyncMock(return_value=small_img),
+            "_load_font",
+            lambda size, bold=False: ImageFont.load_default(size),
         )
+        monkeypatch.setattr(
+            infopuzzle,
+            "ensure_apod_data",
+            AsyncMock(
+                return_value=ApodRecord(
+                    title="Test Nebula",
+                    explanation="A beautiful nebula.",
+                    url="https://example.com/img.jpg",
+                    date="2023-10-01",
+                    media_type="image",
+                )
+            ),
+        )
+        buf = BytesIO()
+        Image.new("RGB", (100, 80), (0, 0, 255)).save(buf, format="PNG")
+        release = asyncio.Event()
+        finished = asyncio.Event()
 
+        async def late_translate(text):
+            await release.wait()
+            finished.set()
+            return "一片美丽的星云。", "deepl"
+
+        monkeypatch.setattr(infopuzzle, "translate_with_backend", late_translate)
+        monkeypatch.setattr(
+            infopuzzle, "_fetch_image", AsyncMock(return_value=buf.getvalue())
+        )
         result = await infopuzzle.generate_apod_image()
         assert result is not None
-        assert isinstance(result, bytes)
-        assert result[:8] == b"\x89PNG\r\n\x1a\n"
+        assert result.degraded
+        assert set(infopuzzle.last_stage_timings) == {
+            "metadata",
+            "layout",
+            "download",
+            "compose",
+            "encode",
+        }
+        assert not list((tmp_path / "rendered").glob("*.img"))
+        # 超时的翻译仍在后台完成, 以便写入翻译缓存
+        assert not finished.is_set()
+        release.set()
+        await asyncio.wait_for(finished.wait(), 5)
 
-        img = Image.open(BytesIO(result))
-        assert img.format == "PNG"
-        assert img.width == 1200
+    def test_layout_is_separate_from_compose(self, monkeypatch):
+        infopuzzle = _get_infopuzzle()
+        monkeypatch.setattr(
+            infopuzzle,
+            "_load_font",
+            lambda size, bold=False: ImageFont.load_default(size),
+        )
+        layout = infopuzzle._layout_text("Nebula", "A nebula.", "版权：无", "日期：x")
+        assert layout is not None
+        assert layout.body_lines == ["A nebula."]
+        data, compose_s, encode_s = infopuzzle._compose_and_encode(
+            layout, None, False, "png", 85, 0
+        )
+        assert Image.open(BytesIO(data)).width == infopuzzle.CANVAS_WIDTH
+        assert compose_s >= 0
+        assert encode_s >= 0
+
+
+class TestRenderExecutor:
+    async def test_render_runs_off_event_loop_thread(self, monkeypatch):
+        import threading
+
+        infopuzzle = _get_infopuzzle()
+        loop_thread = threading.current_thread()
+
+        def _current_thread():
+            return threading.current_thread()
+
+        worker_thread = await infopuzzle._run_in_render_pool(_current_thread)
+        assert worker_thread is not loop_thread
+        assert worker_thread.name.startswith("apod-render")
+
+
+class TestEncodeImage:
+    @staticmethod
+    def _noise(size=(400, 300)) -> Image.Image:
+        return Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3))
+
+    def test_png_is_default(self):
+        infopuzzle = _get_infopuzzle()
+        data = infopuzzle._encode_image(self._noise(), "png", 85, 0)
+        assert Image.open(BytesIO(data)).format == "PNG"
+
+    def test_progressive_jpeg(self):
+        infopuzzle = _get_infopuzzle()
+        data = infopuzzle._encode_image(self._noise(), "jpeg", 85, 0)
+        img = Image.open(BytesIO(data))
+        assert img.format == "JPEG"
+        assert img.info.get("progressive") or img.info.get("progression")
+
+    def test_webp(self):
+        infopuzzle = _get_infopuzzle()
+        if not features.check("webp"):
+            pytest.skip("Pillow 未编译 WebP 支持")
+        data = infopuzzle._encode_image(self._noise(), "webp", 80, 0)
+        assert Image.open(BytesIO(data)).format == "WEBP"
+
+    def test_byte_budget_lowers_quality(self):
+        infopuzzle = _get_infopuzzle()
+        image = self._noise()
+        full = infopuzzle._encode_image(image, "jpeg", 95, 0)
+        budget = len(full) // 2
+        data = infopuzzle._encode_image(image, "jpeg", 95, budget)
+        assert len(data) <= budget
+
+    def test_unreachable_budget_returns_smallest(self):
+        infopuzzle = _get_infopuzzle()
+        image = self._noise()
+        data = infopuzzle._encode_image(image, "jpeg", 95, 1)
+        lowest = infopuzzle._save_image(image, "jpeg", infopuzzle.MIN_QUALITY)
+        assert len(data) == len(lowest)
+
+
+class TestFetchImage:
+    @respx.mock
+    async def test_returns_streamed_bytes(self):
+        infopuzzle = _get_infopuzzle()
+        respx.get("https://example.com/a.jpg").mock(
+            return_value=httpx.Response(200, content=b"x" * 4096)
+        )
+        assert await infopuzzle._fetch_image("https://example.com/a.jpg") == (
+            b"x" * 4096
+        )
+
+    @respx.mock
+    async def test_aborts_when_exceeding_cap(self, monkeypatch):
+        infopuzzle = _get_infopuzzle()
+        monkeypatch.setattr(infopuzzle, "image_max_bytes", 1024)
+        respx.get("https://example.com/a.jpg").mock(
+            return_value=httpx.Response(200, content=b"x" * 4096)
+        )
+        assert await infopuzzle._fetch_image("https://example.com/a.jpg") is None
+
+
+class TestDecodeImage:
+    def test_large_jpeg_is_scaled_to_content_width(self):
+        infopuzzle = _get_infopuzzle()
+        buf = BytesIO()
+        Image.new("RGB", (4800, 3200), (10, 20, 30)).save(buf, format="JPEG")
+        img = infopuzzle._decode_image(buf.getvalue())
+        assert img is not None
+        assert img.mode == "RGB"
+        assert img.size == (
+            infopuzzle.CONTENT_WIDTH,
+            int(3200 * infopuzzle.CONTENT_WIDTH / 4800),
+        )
+
+    def test_small_png_is_upscaled(self):
+        infopuzzle = _get_infopuzzle()
+        buf = BytesIO()
+        Image.new("RGBA", (100, 80), (0, 0, 255, 255)).save(buf, format="PNG")
+        img = infopuzzle._decode_image(buf.getvalue())
+        assert img is not None
+        assert img.size == (
+            infopuzzle.CONTENT_WIDTH,
+            int(80 * infopuzzle.CONTENT_WIDTH / 100),
+        )
+
+    def test_invalid_bytes_return_none(self):
+        infopuzzle = _get_infopuzzle()
+        assert infopuzzle._decode_image(b"not an image") is None
@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import random
+import asyncio
+from io import BytesIO
+from datetime import datetime
+from collections import Counter, OrderedDict
+
+import httpx
+import pytest
+import respx
+from nonebug import App
+from PIL import Image, ImageFont
+from nonebot.adapters import Bot
+from nonebot.exception import ApiNotAvailable
+
+# 广播压测: 默认以小规模运行作为冒烟测试, 通过环境变量放大规模, 例如
+# APOD_LOAD_TARGETS=1000 APOD_LOAD_UPSTREAM_LATENCY=0.3 pytest tests/test_load.py -s
+TARGETS = int(os.getenv("APOD_LOAD_TARGETS", "50"))
+BOTS = int(os.getenv("APOD_LOAD_BOTS", "4"))
+SLOTS = int(os.getenv("APOD_LOAD_SLOTS", "2"))
+UPSTREAM_LATENCY = float(os.getenv("APOD_LOAD_UPSTREAM_LATENCY", "0"))
+UPSTREAM_ERROR_RATE = float(os.getenv("APOD_LOAD_UPSTREAM_ERROR_RATE", "0"))
+SEND_LATENCY = float(os.getenv("APOD_LOAD_SEND_LATENCY", "0"))
+SEND_ERROR_RATE = float(os.getenv("APOD_LOAD_SEND_ERROR_RATE", "0"))
+SEND_RATE = float(os.getenv("APOD_LOAD_SEND_RATE", "0"))
+CONCURRENCY = int(os.getenv("APOD_LOAD_CONCURRENCY", "8"))
+SEED = int(os.getenv("APOD_LOAD_SEED", "0"))
+
+MIRROR_URL = "https://mirror.test/apod"
+IMAGE_URL = "https://apod.nasa.gov/apod/image/load.jpg"
+DEEPL_API_URL = "https://api-free.deepl.com/v2/translate"
+LAG_INTERVAL = 0.01
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def _sample_image() -> bytes:
+    buf = BytesIO()
+    Image.new("RGB", (1600, 1200), (20, 30, 60)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+class FakeUpstream:
+    def __init__(self, latency: float, error_rate: float, seed: int):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests: Counter[str] = Counter()
+        self._random = random.Random(seed)
+
+    def handler(self, name: str, respond):
+        async def _handle(request: httpx.Request) -> httpx.Response:
+            self.requests[name] += 1
+            if self.latency:
+                await asyncio.sleep(self.latency * self._random.uniform(0.5, 1.5))
+            if self._random.random() < self.error_rate:
+                return httpx.Response(503)
+            return respond(request)
+
+        return _handle
+
+    def install(self, router: respx.MockRouter, today: str):
+        apod = {
+            "title": "Load Nebula",
+            "explanation": "A nebula rendered under load. " * 20,
+            "url": IMAGE_URL,
+            "hdurl": IMAGE_URL,
+            "date": today,
+            "media_type": "image",
+        }
+        image = _sample_image()
+
+        def translate(request: httpx.Request) -> httpx.Response:
+            texts = json.loads(request.content)["text"]
+            return httpx.Response(
+                200, json={"translations": [{"text": text} for text in texts]}
+            )
+
+        router.get("https://api.nasa.gov/planetary/apod").mock(
+            side_effect=self.handler("nasa", lambda _: httpx.Response(200, json=apod))
+        )
+        router.get(MIRROR_URL).mock(
+            side_effect=self.handler("mirror", lambda _: httpx.Response(200, json=apod))
+        )
+        router.post(DEEPL_API_URL).mock(side_effect=self.handler("deepl", translate))
+        router.get(IMAGE_URL).mock(
+            side_effect=self.handler(
+                "image",
+                lambda _: httpx.Response(
+                    200, content=image, headers={"Content-Type": "image/jpeg"}
+                ),
+            )
+        )
+
+
+class LoadBot(Bot):
+    def __init__(self, adapter, self_id: str, recorder: "DeliveryRecorder"):
+        super().__init__(adapter, self_id)
+        self.recorder = recorder
+
+    async def send(self, event, message, **kwargs):
+        return await self.recorder.send(self, event)
+
+
+class DeliveryRecorder:
+    def __init__(self, latency: float, error_rate: float, seed: int):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.started = 0.0
+        self.latencies: dict[str, float] = {}
+        self.attempts: Counter[str] = Counter()
+        self._random = random.Random(seed)
+
+    async def send(self, bot: Bot, target) -> dict:
+        self.attempts[target.id] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * self._random.uniform(0.5, 1.5))
+        if self._random.random() < self.error_rate:
+            raise ApiNotAvailable("injected send failure")
+        self.latencies[target.id] = time.perf_counter() - self.started
+        return {"message_id": f"{bot.self_id}:{target.id}"}
+
+
+async def _monitor_loop_lag(lags: list[float]):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + LAG_INTERVAL
+        await asyncio.sleep(LAG_INTERVAL)
+        lags.append(max(loop.time() - expected, 0))
+
+
+@pytest.fixture
+def isolated_plugin(tmp_path, monkeypatch):
+    import nonebot_plugin_argot.data_source as argot_data
+
+    import nonebot_plugin_apod.apod as apod
+    import nonebot_plugin_apod.utils as utils
+    import nonebot_plugin_apod.sender as sender
+    import nonebot_plugin_apod.archive as archive
+    import nonebot_plugin_apod.http_cache as http_cache
+    import nonebot_plugin_apod.infopuzzle as infopuzzle
+    import nonebot_plugin_apod.trans_cache as trans_cache
+    import nonebot_plugin_apod.render_cache as render_cache
+    from nonebot_plugin_apod.config import MirrorConfig
+
+    argot_file = tmp_path / "argot.json"
+    argot_file.write_text("[]")
+    monkeypatch.setattr(argot_data, "JSON_FILE", argot_file)
+
+    monkeypatch.setattr(apod, "task_config_file", tmp_path / "tasks.json")
+    monkeypatch.setattr(apod, "apod_infopuzzle", True)
+    monkeypatch.setattr(apod, "broadcast_concurrency", CONCURRENCY)
+    monkeypatch.setattr(utils, "apod_cache_json", tmp_path / "apod.json")
+    monkeypatch.setattr(utils, "_apod_records", {})
+    monkeypatch.setattr(utils, "_fetch_tasks", {})
+    monkeypatch.setattr(utils, "_fetch_failures", {})
+    monkeypatch.setattr(utils, "_upstream_pool", None)
+    monkeypatch.setattr(utils, "_translator_stats", {})
+    monkeypatch.setattr(utils, "mirror_url", None)
+    monkeypatch.setattr(utils, "mirrors", [MirrorConfig(url=MIRROR_URL)])
+    monkeypatch.setattr(utils, "deepl_trans", True)
+    monkeypatch.setattr(utils, "deepl_trans_api_key", "LOAD_TEST_KEY")
+    monkeypatch.setattr(sender, "_queues", {})
+    monkeypatch.setattr(sender, "send_rate", SEND_RATE)
+    monkeypatch.setattr(sender, "send_retry_backoff", 0.01)
+    monkeypatch.setattr(http_cache, "http_cache_dir", tmp_path / "http")
+    monkeypatch.setattr(render_cache, "render_cache_dir", tmp_path / "rendered")
+    monkeypatch.setattr(
+        infopuzzle, "_load_font", lambda size, bold=False: ImageFont.load_default(size)
+    )
+    trans_cache.close_translation_db()
+    archive.close_archive_db()
+    monkeypatch.setattr(trans_cache, "translation_db_file", tmp_path / "trans.db")
+    monkeypatch.setattr(trans_cache, "_memory_cache", OrderedDict())
+    monkeypatch.setattr(archive, "archive_db_file", tmp_path / "archive.db")
+    yield apod
+    apod.sync_apod_jobs([])
+    trans_cache.close_translation_db()
+    archive.close_archive_db()
+
+
+async def test_broadcast_load(app: App, isolated_plugin):
+    from nonebot_plugin_apscheduler import scheduler
+    from nonebot_plugin_alconna.uniseg import Target
+
+    from nonebot_plugin_apod.media import clear_image_handles
+    from nonebot_plugin_apod.config import clear_cache_image
+
+    apod = isolated_plugin
+    today = datetime.now().strftime("%Y-%m-%d")
+    upstream = FakeUpstream(UPSTREAM_LATENCY, UPSTREAM_ERROR_RATE, SEED)
+    recorder = DeliveryRecorder(SEND_LATENCY, SEND_ERROR_RATE, SEED)
+    send_times = [f"13:{minute:02d}" for minute in range(SLOTS)]
+    tasks = [
+        {
+            "send_time": send_times[i % SLOTS],
+            "target": Target(str(i), self_id=f"load-bot-{i % BOTS}"),
+        }
+        for i in range(TARGETS)
+    ]
+    await apod.save_task_configs(tasks)
+    await clear_cache_image()
+    clear_image_handles()
+
+    async with app.test_api() as ctx:
+        adapter = ctx.create_adapter()
+        bots = [LoadBot(adapter, f"load-bot-{i}", recorder) for i in range(BOTS)]
+        for bot in bots:
+            adapter.bot_connect(bot)
+        lags: list[float] = []
+        monitor = asyncio.create_task(_monitor_loop_lag(lags))
+        try:
+            with respx.mock(assert_all_called=False) as router:
+                upstream.install(router, today)
+                await apod.restore_apod_tasks()
+                jobs = [
+                    job
+                    for job in scheduler.get_jobs()
+                    if job.id.startswith(apod.SLOT_JOB_PREFIX)
+                ]
+                assert len(jobs) == SLOTS
+                # 模拟各批次的定时任务在同一时刻触发
+                recorder.started = time.perf_counter()
+                results = await asyncio.gather(*(job.func(*job.args) for job in jobs))
+                elapsed = time.perf_counter() - recorder.started
+        finally:
+            monitor.cancel()
+            for bot in bots:
+                adapter.bot_disconnect(bot)
+            await clear_cache_image()
+            clear_image_handles()
+
+    succeeded = sum(stats.succeeded for stats in results)
+    failed = sum(stats.failed for stats in results)
+    latencies = list(recorder.latencies.values())
+    print(
+        f"\n目标 {TARGETS} 个, 机器人 {BOTS} 个, 批次 {SLOTS} 个, "
+        f"成功 {succeeded}, 失败 {failed}, 总耗时 {elapsed:.2f}s\n"
+        f"吞吐量 {succeeded / elapsed:.1f} 条/s, "
+        f"送达延迟 p50 {_percentile(latencies, 0.5) * 1000:.0f}ms "
+        f"p99 {_percentile(latencies, 0.99) * 1000:.0f}ms\n"
+        f"上游请求 {dict(upstream.requests)}, "
+        f"发送尝试 {sum(recorder.attempts.values())}\n"
+        f"事件循环延迟 p99 {_percentile(lags, 0.99) * 1000:.1f}ms "
+        f"最大 {max(lags, default=0) * 1000:.1f}ms"
+    )
+
+    assert sum(stats.total for stats in results) == TARGETS
+    assert succeeded + failed == TARGETS
+    assert len(recorder.latencies) == succeeded
+    if UPSTREAM_ERROR_RATE == 0:
+        # 各批次共享一次元数据获取
+        assert upstream.requests["nasa"] + upstream.requests["mirror"] == 1
+    if SEND_ERROR_RATE == 0:
+        assert failed == 0
+        assert all(count == 1 for count in recorder.attempts.values())
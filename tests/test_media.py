@@ -0,0 +1,90 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+
+def _get_media():
+    import nonebot_plugin_apod.media as media
+
+    return media
+
+
+def _fake_bot(adapter: str, self_id: str = "bot", **attrs):
+    adapter_obj = SimpleNamespace(get_name=lambda: adapter)
+    return SimpleNamespace(self_id=self_id, adapter=adapter_obj, **attrs)
+
+
+@pytest.fixture(autouse=True)
+def _clear_handles():
+    _get_media().clear_image_handles()
+    yield
+    _get_media().clear_image_handles()
+
+
+class TestSendImageOnce:
+    async def test_telegram_reuses_file_id_from_receipt(self):
+        media = _get_media()
+        bot = _fake_bot("Telegram")
+        sent = []
+
+        async def send(image):
+            sent.append(image)
+            photo = SimpleNamespace(file_id="file-123")
+            return SimpleNamespace(msg_ids=[SimpleNamespace(photo=[photo])])
+
+        for _ in range(3):
+            await media.send_image_once(bot, b"png", "digest", send)
+        assert sent[0].raw == b"png"
+        assert [image.id for image in sent[1:]] == ["file-123", "file-123"]
+
+    async def test_kook_uploads_once_before_sending(self):
+        media = _get_media()
+        uploads = []
+
+        async def upload_file(raw):
+            uploads.append(raw)
+            await asyncio.sleep(0)
+            return "https://img.kookapp.cn/apod.png"
+
+        bot = _fake_bot("Kaiheila", upload_file=upload_file)
+        sent = []
+
+        async def send(image):
+            sent.append(image)
+            return SimpleNamespace(msg_ids=[])
+
+        await asyncio.gather(
+            *(media.send_image_once(bot, b"png", "digest", send) for _ in range(5))
+        )
+        assert uploads == [b"png"]
+        assert all(image.url == "https://img.kookapp.cn/apod.png" for image in sent)
+
+    async def test_unsupported_adapter_falls_back_to_raw(self):
+        media = _get_media()
+        bot = _fake_bot("OneBot V11")
+        sent = []
+
+        async def send(image):
+            sent.append(image)
+            return SimpleNamespace(msg_ids=[{"message_id": 1}])
+
+        for _ in range(2):
+            await media.send_image_once(bot, b"png", "digest", send)
+        assert [image.raw for image in sent] == [b"png", b"png"]
+
+    async def test_failed_handle_falls_back_to_raw(self):
+        media = _get_media()
+        bot = _fake_bot("Telegram")
+        sent = []
+
+        async def send(image):
+            sent.append(image)
+            if image.id:
+                raise RuntimeError("file id expired")
+            photo = SimpleNamespace(file_id="stale")
+            return SimpleNamespace(msg_ids=[SimpleNamespace(photo=[photo])])
+
+        await media.send_image_once(bot, b"png", "digest", send)
+        await media.send_image_once(bot, b"png", "digest", send)
+        assert [image.id for image in sent] == [None, "stale", None]
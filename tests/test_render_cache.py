@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def render_cache(tmp_path, monkeypatch):
+    import nonebot_plugin_apod.render_cache as render_cache
+
+    monkeypatch.setattr(render_cache, "render_cache_dir", tmp_path)
+    return render_cache
+
+
+class TestRenderCache:
+    async def test_miss_returns_none(self, render_cache):
+        assert await render_cache.get_rendered_image("missing") is None
+
+    async def test_put_then_get(self, render_cache, tmp_path):
+        key = render_cache.render_cache_key("2023-10-01", False, "none", 1)
+        await render_cache.put_rendered_image(key, b"png")
+        assert await render_cache.get_rendered_image(key) == b"png"
+        assert not list(tmp_path.glob("*.tmp"))
+
+    def test_key_depends_on_every_part(self, render_cache):
+        base = render_cache.render_cache_key("2023-10-01", False, "deepl", 1)
+        assert base.startswith("2023-10-01_")
+        assert base != render_cache.render_cache_key("2023-10-01", True, "deepl", 1)
+        assert base != render_cache.render_cache_key("2023-10-01", False, "baidu", 1)
+        assert base != render_cache.render_cache_key("2023-10-01", False, "deepl", 2)
+
+    async def test_evicts_least_recently_used(self, render_cache, monkeypatch):
+        monkeypatch.setattr(render_cache, "render_cache_max_bytes", 10)
+        await render_cache.put_rendered_image("old", b"12345")
+        await render_cache.put_rendered_image("recent", b"12345")
+        os.utime(render_cache.render_cache_dir / "old.img", (0, 0))
+        os.utime(render_cache.render_cache_dir / "recent.img", (1, 1))
+        await render_cache.get_rendered_image("old")
+        await render_cache.put_rendered_image("new", b"12345")
+        assert await render_cache.get_rendered_image("old") == b"12345"
+        assert await render_cache.get_rendered_image("recent") is None
+        assert await render_cache.get_rendered_image("new") == b"12345"
+
+    def test_atomic_write_uses_unique_temp_files(self, tmp_path, monkeypatch):
+        import nonebot_plugin_apod.diskcache as diskcache
+
+        replaced = []
+        real_replace = os.replace
+
+        def _replace(src, dst):
+            replaced.append(src)
+            real_replace(src, dst)
+
+        monkeypatch.setattr(diskcache.os, "replace", _replace)
+        target = tmp_path / "same.img"
+        diskcache.atomic_write_bytes(target, b"first")
+        diskcache.atomic_write_bytes(target, b"second")
+        assert len(set(replaced)) == 2
+        assert target.read_bytes() == b"second"
+        assert not list(tmp_path.glob("*.tmp"))
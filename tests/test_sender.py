@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+from nonebot.exception import ActionFailed, NetworkError, ApiNotAvailable
+
+
+def _get_sender():
+    import nonebot_plugin_apod.sender as sender
+
+    return sender
+
+
+class TestTokenBucket:
+    async def test_burst_then_rate_limited(self):
+        sender = _get_sender()
+        bucket = sender.TokenBucket(rate=20, capacity=2)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(4):
+            await bucket.acquire()
+        # 前两个令牌来自突发容量, 后两个各需等待 1/20 秒
+        assert loop.time() - start >= 0.09
+
+    async def test_zero_rate_is_unlimited(self):
+        sender = _get_sender()
+        bucket = sender.TokenBucket(rate=0, capacity=1)
+        for _ in range(100):
+            await bucket.acquire()
+
+
+class TestBotSendQueue:
+    async def test_retries_transient_errors(self):
+        sender = _get_sender()
+        queue = sender.BotSendQueue(
+            "bot", rate=0, burst=1, concurrency=1, retries=2, backoff=0
+        )
+        attempts = []
+
+        async def flaky_send():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ApiNotAvailable("fake")
+            return "receipt"
+
+        assert await queue.submit(flaky_send) == "receipt"
+        assert len(attempts) == 3
+
+    async def test_gives_up_after_retries(self):
+        sender = _get_sender()
+        queue = sender.BotSendQueue(
+            "bot", rate=0, burst=1, concurrency=1, retries=1, backoff=0
+        )
+        attempts = []
+
+        async def failing_send():
+            attempts.append(1)
+            raise ApiNotAvailable("fake")
+
+        with pytest.raises(ApiNotAvailable):
+            await queue.submit(failing_send)
+        assert len(attempts) == 2
+
+    async def test_does_not_retry_other_errors(self):
+        sender = _get_sender()
+        queue = sender.BotSendQueue(
+            "bot", rate=0, burst=1, concurrency=1, retries=3, backoff=0
+        )
+        attempts = []
+
+        async def broken_send():
+            attempts.append(1)
+            raise ValueError("bad message")
+
+        with pytest.raises(ValueError, match="bad message"):
+            await queue.submit(broken_send)
+        assert len(attempts) == 1
+
+    async def test_retries_only_rate_limited_action_failures(self):
+        sender = _get_sender()
+        queue = sender.BotSendQueue(
+            "bot", rate=0, burst=1, concurrency=1, retries=3, backoff=0
+        )
+
+        class FakeActionFailed(ActionFailed):
+            def __init__(self, status_code: int):
+                self.status_code = status_code
+
+        attempts = []
+
+        async def rate_limited_send():
+            attempts.append(1)
+            if len(attempts) < 2:
+                raise FakeActionFailed(429)
+            raise FakeActionFailed(403)
+
+        with pytest.raises(FakeActionFailed):
+            await queue.submit(rate_limited_send)
+        assert len(attempts) == 2
+
+    async def test_send_timeout_is_final(self):
+        sender = _get_sender()
+        queue = sender.BotSendQueue(
+            "bot", rate=0, burst=1, concurrency=1, retries=3, backoff=0
+        )
+        attempts = []
+
+        async def timed_out_send():
+            attempts.append(1)
+            # OneBot 适配器在 API 调用超时时抛出的错误
+            raise NetworkError("WebSocket call api timeout")
+
+        with pytest.raises(NetworkError):
+            await queue.submit(timed_out_send)
+        assert len(attempts) == 1
+
+    async def test_bounds_concurrency(self):
+        sender = _get_sender()
+        queue = sender.BotSendQueue(
+            "bot", rate=0, burst=1, concurrency=2, retries=0, backoff=0
+        )
+        running = 0
+        peak = 0
+
+        async def slow_send():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(*(queue.submit(slow_send) for _ in range(6)))
+        assert peak == 2
+
+    def test_one_queue_per_bot(self):
+        sender = _get_sender()
+        assert sender.get_send_queue("a") is sender.get_send_queue("a")
+        assert sender.get_send_queue("a") is not sender.get_send_queue("b")
@@ -1,6 +1,12 @@
+import json
 import asyncio
+from collections import OrderedDict
 from unittest.mock import patch
 
+import httpx
+import pytest
+import respx
+
 
 def _get_utils():
     import nonebot_plugin_apod.utils as utils
@@ -8,6 +14,18 @@ def _get_utils():
     return utils
 
 
+@pytest.fixture(autouse=True)
+def trans_cache(tmp_path, monkeypatch):
+    import nonebot_plugin_apod.trans_cache as trans_cache
+
+    trans_cache.close_translation_db()
+    monkeypatch.setattr(_get_utils(), "_translator_stats", {})
+    monkeypatch.setattr(trans_cache, "translation_db_file", tmp_path / "trans.db")
+    monkeypatch.setattr(trans_cache, "_memory_cache", OrderedDict())
+    yield trans_cache
+    trans_cache.close_translation_db()
+
+
 class TestTranslateTextAuto:
     async def test_no_translator_returns_original(self):
         utils = _get_utils()
@@ -59,3 +77,320 @@ class TestTranslateTextAuto:
         ):
             result = await utils.translate_text_auto("hello world")
             assert result == "你好世界"
+
+
+class TestTranslationCache:
+    async def test_second_call_is_served_from_cache(self):
+        utils = _get_utils()
+        calls = []
+
+        async def mock_translate(text):
+            calls.append(text)
+            return "你好世界"
+
+        with (
+            patch.object(utils, "qwen_trans", True),
+            patch.object(utils, "qwen_translate_text", mock_translate),
+        ):
+            assert await utils.translate_text_auto("hello world") == "你好世界"
+            assert await utils.translate_text_auto("hello world") == "你好世界"
+        assert calls == ["hello world"]
+
+    async def test_failures_are_not_cached(self):
+        utils = _get_utils()
+        results = iter([RuntimeError("API error"), "你好"])
+
+        async def flaky_translate(text):
+            result = next(results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with (
+            patch.object(utils, "qwen_trans", True),
+            patch.object(utils, "qwen_translate_text", flaky_translate),
+        ):
+            assert await utils.translate_text_auto("hello") == "hello"
+            assert await utils.translate_text_auto("hello") == "你好"
+
+    async def test_persists_across_memory_eviction(self, trans_cache):
+        key = trans_cache.translation_key("hello", "deepl", "ZH")
+        await trans_cache.put_cached_translation(key, "你好")
+        trans_cache._memory_cache.clear()
+        assert await trans_cache.get_cached_translation(key) == "你好"
+
+    async def test_key_depends_on_backend_and_model(self, trans_cache):
+        key = trans_cache.translation_key("hello", "qwen", "Chinese", "qwen-mt-flash")
+        assert key != trans_cache.translation_key("hello", "deepl", "Chinese")
+        assert key != trans_cache.translation_key(
+            "hello", "qwen", "Chinese", "qwen-mt-plus"
+        )
+
+    async def test_memory_cache_is_bounded(self, trans_cache, monkeypatch):
+        monkeypatch.setattr(trans_cache, "memory_cache_size", 2)
+        for i in range(3):
+            await trans_cache.put_cached_translation(f"key{i}", f"text{i}")
+        assert list(trans_cache._memory_cache) == ["key1", "key2"]
+
+
+class TestTranslatorChain:
+    async def test_falls_back_to_next_backend(self):
+        utils = _get_utils()
+
+        async def failing_translate(text):
+            raise RuntimeError("API error")
+
+        async def deepl_translate(text):
+            return "你好"
+
+        with (
+            patch.object(utils, "qwen_trans", True),
+            patch.object(utils, "deepl_trans", True),
+            patch.object(utils, "qwen_translate_text", failing_translate),
+            patch.object(utils, "deepl_translate_text", deepl_translate),
+        ):
+            assert await utils.translate_text_auto("hello") == "你好"
+        assert utils._translator_stats["qwen"].error_rate > 0
+
+    async def test_slow_backend_is_cut_off_for_next(self):
+        utils = _get_utils()
+
+        async def slow_translate(text):
+            await asyncio.sleep(10)
+            return "慢"
+
+        async def deepl_translate(text):
+            return "快"
+
+        with (
+            patch.object(utils, "qwen_trans", True),
+            patch.object(utils, "deepl_trans", True),
+            patch.object(utils, "translate_backend_timeout", 0.05),
+            patch.object(utils, "qwen_translate_text", slow_translate),
+            patch.object(utils, "deepl_translate_text", deepl_translate),
+        ):
+            assert await utils.translate_text_auto("hello", timeout=5) == "快"
+
+    async def test_order_follows_backend_stats(self):
+        utils = _get_utils()
+        calls = []
+
+        async def qwen_translate(text):
+            calls.append("qwen")
+            return "千问"
+
+        async def deepl_translate(text):
+            calls.append("deepl")
+            return "DeepL"
+
+        utils._translator_health("qwen").record_failure()
+        with (
+            patch.object(utils, "qwen_trans", True),
+            patch.object(utils, "deepl_trans", True),
+            patch.object(utils, "qwen_translate_text", qwen_translate),
+            patch.object(utils, "deepl_translate_text", deepl_translate),
+        ):
+            assert await utils.translate_text_auto("hello") == "DeepL"
+        assert calls == ["deepl"]
+
+    async def test_untried_backends_keep_configured_order(self):
+        utils = _get_utils()
+        calls = []
+
+        def backend(name):
+            async def translate(text):
+                calls.append(name)
+                return f"{name}:{text}"
+
+            return translate
+
+        with (
+            patch.object(utils, "qwen_trans", True),
+            patch.object(utils, "deepl_trans", True),
+            patch.object(utils, "baidu_trans", True),
+            patch.object(utils, "qwen_translate_text", backend("qwen")),
+            patch.object(utils, "deepl_translate_text", backend("deepl")),
+            patch.object(utils, "baidu_translate_text", backend("baidu")),
+        ):
+            for text in ("one", "two", "three"):
+                assert await utils.translate_text_auto(text) == f"qwen:{text}"
+        assert calls == ["qwen", "qwen", "qwen"]
+
+    async def test_reports_backend_that_translated(self):
+        utils = _get_utils()
+
+        async def qwen_translate(text):
+            raise RuntimeError("down")
+
+        async def deepl_translate(text):
+            return "你好"
+
+        with (
+            patch.object(utils, "qwen_trans", True),
+            patch.object(utils, "deepl_trans", True),
+            patch.object(utils, "qwen_translate_text", qwen_translate),
+            patch.object(utils, "deepl_translate_text", deepl_translate),
+        ):
+            assert await utils.get_cached_translation_text("hello") is None
+            assert await utils.translate_with_backend("hello") == ("你好", "deepl")
+            assert await utils.get_cached_translation_text("hello") == (
+                "你好",
+                "deepl",
+            )
+
+    async def test_race_takes_first_success(self):
+        utils = _get_utils()
+        cancelled = asyncio.Event()
+
+        async def slow_translate(text):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return "慢"
+
+        async def deepl_translate(text):
+            return "快"
+
+        with (
+            patch.object(utils, "qwen_trans", True),
+            patch.object(utils, "deepl_trans", True),
+            patch.object(utils, "translate_race", 2),
+            patch.object(utils, "qwen_translate_text", slow_translate),
+            patch.object(utils, "deepl_translate_text", deepl_translate),
+        ):
+            assert await utils.translate_text_auto("hello") == "快"
+        assert cancelled.is_set()
+        assert "qwen" not in utils._translator_stats or (
+            utils._translator_stats["qwen"].error_rate == 0
+        )
+
+    async def test_configured_order_and_name(self):
+        utils = _get_utils()
+        with (
+            patch.object(utils, "qwen_trans", True),
+            patch.object(utils, "baidu_trans", True),
+            patch.object(utils, "translator_order", ["baidu"]),
+        ):
+            names = [t[0] for t in utils._get_translators()]
+            assert names == ["baidu", "qwen"]
+            assert utils._translator_label(utils._get_translators()[0]) == "baidu"
+
+
+class TestSegmentedTranslation:
+    def test_split_keeps_paragraphs_and_groups_sentences(self):
+        utils = _get_utils()
+        with patch.object(utils, "translate_segment_chars", 30):
+            paragraphs = utils._split_segments(
+                "First one. Second one. A much longer third sentence.\nNext."
+            )
+        assert paragraphs == [
+            ["First one. Second one.", "A much longer third sentence."],
+            ["Next."],
+        ]
+
+    @respx.mock
+    async def test_deepl_batches_deduped_segments(self):
+        utils = _get_utils()
+        route = respx.post(utils.DEEPL_API_URL).mock(
+            side_effect=lambda request: httpx.Response(
+                200,
+                json={
+                    "translations": [
+                        {"text": f"<{t}>"} for t in json.loads(request.content)["text"]
+                    ]
+                },
+            )
+        )
+        with (
+            patch.object(utils, "deepl_trans", True),
+            patch.object(utils, "translate_segment_chars", 1),
+        ):
+            result = await utils.translate_text_auto("Stars. Dust.\nStars.")
+        assert result == "<Stars.><Dust.>\n<Stars.>"
+        assert route.call_count == 1
+        assert json.loads(route.calls.last.request.content)["text"] == [
+            "Stars.",
+            "Dust.",
+        ]
+
+    async def test_qwen_segments_run_concurrently_with_cap(self):
+        utils = _get_utils()
+        running = 0
+        peak = 0
+
+        async def qwen_translate(text):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return text.upper()
+
+        with (
+            patch.object(utils, "qwen_trans", True),
+            patch.object(utils, "qwen_translate_text", qwen_translate),
+            patch.object(utils, "translate_segment_chars", 1),
+            patch.object(utils, "translate_concurrency", 2),
+        ):
+            result = await utils.translate_text_auto("A a. B b. C c. D d.")
+        assert result == "A A.B B.C C.D D."
+        assert peak == 2
+
+    async def test_only_missing_segments_are_translated(self):
+        utils = _get_utils()
+        calls = []
+
+        async def qwen_translate(text):
+            calls.append(text)
+            return f"[{text}]"
+
+        with (
+            patch.object(utils, "qwen_trans", True),
+            patch.object(utils, "qwen_translate_text", qwen_translate),
+            patch.object(utils, "translate_segment_chars", 1),
+        ):
+            assert await utils.translate_text_auto("One.") == "[One.]"
+            result = await utils.translate_text_auto("One. Two.")
+        assert result == "[One.][Two.]"
+        assert calls == ["One.", "Two."]
+
+
+class TestQwenStreaming:
+    @staticmethod
+    def _sse(*chunks: str) -> bytes:
+        lines = [
+            "data: "
+            + json.dumps(
+                {"choices": [{"delta": {"content": chunk}}]}, ensure_ascii=False
+            )
+            for chunk in chunks
+        ]
+        return ("\n\n".join([*lines, "data: [DONE]"]) + "\n\n").encode()
+
+    @respx.mock
+    async def test_cumulative_stream(self):
+        utils = _get_utils()
+        route = respx.post(url__regex=r".*/chat/completions").mock(
+            return_value=httpx.Response(200, content=self._sse("一片", "一片星云"))
+        )
+        with patch.object(utils, "qwen_mt_stream", True):
+            assert await utils.qwen_translate_text("A nebula") == "一片星云"
+        payload = json.loads(route.calls.last.request.content)
+        assert payload["stream"] is True
+        assert payload["incremental_output"] is False
+
+    @respx.mock
+    async def test_incremental_stream(self):
+        utils = _get_utils()
+        route = respx.post(url__regex=r".*/chat/completions").mock(
+            return_value=httpx.Response(200, content=self._sse("星", "星云"))
+        )
+        with (
+            patch.object(utils, "qwen_mt_stream", True),
+            patch.object(utils, "qwen_mt_incremental_output", True),
+        ):
+            # 增量分片恰好以已拼接内容开头时也不能被当作完整译文
+            assert await utils.qwen_translate_text("A nebula") == "星星云"
+        assert json.loads(route.calls.last.request.content)["incremental_output"]
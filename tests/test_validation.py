@@ -60,3 +60,22 @@ class TestIsValidDateFormat:
     )
     def test_invalid_format(self, date_str):
         assert self.is_valid_date_format(date_str) is False
+
+
+class TestTranslateTimeouts:
+    def test_render_timeout_follows_translate_budget(self):
+        from nonebot_plugin_apod.config import Config
+
+        assert Config().apod_render_translate_timeout == 9.0
+        config = Config(apod_translate_timeout=12)
+        assert config.apod_render_translate_timeout == 13.0
+
+    def test_render_timeout_below_budget_is_rejected(self):
+        from pydantic import ValidationError
+
+        from nonebot_plugin_apod.config import Config
+
+        with pytest.raises(ValidationError):
+            Config(apod_render_translate_timeout=6)
+        config = Config(apod_render_translate_timeout=10)
+        assert config.apod_render_translate_timeout == 10